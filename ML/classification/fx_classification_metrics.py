@@ -1,13 +1,238 @@
 # Importaciones necesarias
+import hashlib
+import pickle
+import joblib
+from collections import OrderedDict
 import pandas as pd
 import numpy as np
-from sklearn.metrics import (
-    accuracy_score, precision_score, recall_score, f1_score, cohen_kappa_score, roc_auc_score
-)
+from itertools import combinations
+from scipy.stats import rankdata
+from sklearn.base import clone
+from sklearn.metrics import roc_auc_score
 from sklearn.model_selection import cross_val_score
 
+# Caché LRU en memoria de puntuaciones de validación cruzada, indexada por huella de modelo y datos
+_cache_cv = OrderedDict()
+TAMANO_CACHE_CV = 128  # Validaciones cruzadas distintas que se recuerdan como máximo
+
+def limpiar_cache_cv():
+    """
+    Vacía la caché de validación cruzada (p. ej. para liberar memoria en sesiones largas).
+    """
+    _cache_cv.clear()
+
+def _huella_datos(datos, h):
+    """
+    Añade al hash `h` el contenido, forma y tipo de `datos` (array, DataFrame o Series).
+    """
+    if isinstance(datos, (pd.DataFrame, pd.Series)):
+        etiquetas = (list(datos.columns), list(datos.dtypes)) if isinstance(datos, pd.DataFrame) else (datos.name, datos.dtype)
+        h.update(repr(etiquetas).encode())
+        h.update(pd.util.hash_pandas_object(datos, index=True).values.tobytes())
+        return
+    array = np.asarray(datos)
+    h.update(repr((array.shape, array.dtype.str)).encode())
+    if array.dtype == object:
+        h.update(pickle.dumps(array))
+    else:
+        h.update(np.ascontiguousarray(array).tobytes())
+
+def huella_validacion_cruzada(modelo, X_train, y_train, cv=5):
+    """
+    Calcula la clave de caché de una validación cruzada.
+
+    La clave combina la clase y los hiperparámetros del modelo, la estrategia de validación
+    y el contenido de los datos de entrenamiento, de modo que cualquier cambio invalida la caché.
+    El modelo (sin entrenar, con `clone`) y `cv` se resumen con `joblib.hash`, que recorre el
+    contenido completo de los parámetros (p. ej. arrays de pesos, que `repr` abreviaría).
+
+    Returns:
+        str: Hash SHA-256 en hexadecimal.
+    """
+    h = hashlib.sha256()
+    h.update(joblib.hash(clone(modelo)).encode())
+    h.update(joblib.hash(cv).encode())
+    _huella_datos(X_train, h)
+    _huella_datos(y_train, h)
+    return h.hexdigest()
+
+def _es_reproducible(modelo, cv):
+    """
+    Indica si la validación cruzada da siempre el mismo resultado: todos los `random_state` del modelo
+    (incluidos los de pasos anidados) son enteros y `cv` es un número de folds, una lista de
+    particiones o una estrategia sin barajado o con semilla fija.
+    """
+    for nombre, valor in modelo.get_params(deep=True).items():
+        if nombre.split('__')[-1] == 'random_state' and not isinstance(valor, (int, np.integer)):
+            return False
+    if isinstance(cv, (int, np.integer, list, tuple)):
+        return True
+    if not hasattr(cv, 'split'):
+        return False  # Iterador de particiones: se consume al usarlo y no se puede identificar
+    # Las estrategias con `shuffle` solo barajan si está activo; las demás con `random_state` (ShuffleSplit...) siempre
+    if getattr(cv, 'shuffle', hasattr(cv, 'random_state')):
+        return isinstance(getattr(cv, 'random_state', None), (int, np.integer))
+    return True
+
+# Validación cruzada paralela con caché
+def validacion_cruzada(modelo, X_train, y_train, cv=5, n_jobs=None, usar_cache=True):
+    """
+    Ejecuta `cross_val_score` repartiendo los folds entre procesos y reutilizando resultados previos.
+
+    Args:
+        modelo: Modelo de clasificación (se clona en cada fold, no se modifica).
+        X_train (array-like): Datos de entrenamiento.
+        y_train (array-like): Etiquetas de entrenamiento.
+        cv (int, opcional): Número de folds o estrategia de validación cruzada.
+        n_jobs (int, opcional): Número de procesos para los folds (None = secuencial, -1 = todos los núcleos).
+        usar_cache (bool, opcional): Si es True, reutiliza las puntuaciones de un mismo modelo y datos.
+            La caché no se usa si el modelo o `cv` no son reproducibles (sin `random_state` fijo)
+            y guarda solo las `TAMANO_CACHE_CV` validaciones usadas más recientemente.
+
+    Returns:
+        np.ndarray: Puntuaciones de exactitud de cada fold.
+    """
+    usar_cache = usar_cache and _es_reproducible(modelo, cv)
+    clave = huella_validacion_cruzada(modelo, X_train, y_train, cv) if usar_cache else None
+    if clave is not None and clave in _cache_cv:
+        _cache_cv.move_to_end(clave)
+        return _cache_cv[clave].copy()
+
+    puntuaciones = cross_val_score(modelo, X_train, y_train, cv=cv, n_jobs=n_jobs)
+
+    if clave is not None:
+        _cache_cv[clave] = puntuaciones.copy()
+        if len(_cache_cv) > TAMANO_CACHE_CV:
+            _cache_cv.popitem(last=False)  # Se descarta la validación usada hace más tiempo
+    return puntuaciones
+
+# Métricas de clasificación a partir de una única matriz de confusión
+def metricas_matriz_confusion(y_test, y_pred):
+    """
+    Construye la matriz de confusión en una sola pasada y deriva de ella todas las métricas.
+
+    Las etiquetas se codifican como enteros con `pd.factorize` (tabla hash, O(n)) y la matriz
+    se obtiene con un único `np.bincount`; el resto de métricas cuesta O(k²) con k clases.
+    Los resultados coinciden con `accuracy_score`, `precision_score`/`recall_score`/`f1_score`
+    (average=None, promediadas) y `cohen_kappa_score` de sklearn.
+
+    Args:
+        y_test (array-like): Valores reales de la variable objetivo.
+        y_pred (array-like): Valores predichos por el modelo.
+
+    Returns:
+        dict: 'matriz' (np.ndarray k×k, filas = reales), 'clases' (etiquetas en el orden de la matriz),
+        'exactitud', 'precision', 'recall', 'f1' (arrays por clase), 'cohen_kappa' y
+        'n_clases_reales' (clases presentes en `y_test`).
+    """
+    y_test = np.asarray(y_test).ravel()
+    y_pred = np.asarray(y_pred).ravel()
+    if y_test.shape != y_pred.shape:
+        raise ValueError(f"y_test e y_pred deben tener la misma longitud ({y_test.size} != {y_pred.size})")
+
+    n = y_test.size
+    codigos, clases = pd.factorize(np.concatenate([y_test, y_pred]), sort=True)
+    k = len(clases)
+    matriz = np.bincount(codigos[:n] * k + codigos[n:], minlength=k * k).reshape(k, k)
+
+    verdaderos = np.diag(matriz).astype(np.float64)
+    reales = matriz.sum(axis=1)        # Soporte de cada clase (TP + FN)
+    predichos = matriz.sum(axis=0)     # Predicciones de cada clase (TP + FP)
+
+    # Igual que sklearn con zero_division por defecto: 0 cuando el denominador es 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        precision = np.where(predichos > 0, verdaderos / predichos, 0.0)
+        recall = np.where(reales > 0, verdaderos / reales, 0.0)
+        denominador_f1 = reales + predichos
+        f1 = np.where(denominador_f1 > 0, 2 * verdaderos / denominador_f1, 0.0)
+
+    # Cohen Kappa: acuerdo observado frente al esperado por azar, desde las marginales
+    acuerdo_observado = verdaderos.sum() / n
+    acuerdo_esperado = np.dot(reales, predichos) / (n * n)
+    cohen_kappa = (acuerdo_observado - acuerdo_esperado) / (1 - acuerdo_esperado) if acuerdo_esperado != 1 else np.nan
+
+    return {
+        'matriz': matriz,
+        'clases': np.asarray(clases),
+        'exactitud': float(acuerdo_observado),
+        'precision': precision,
+        'recall': recall,
+        'f1': f1,
+        'cohen_kappa': float(cohen_kappa),
+        'n_clases_reales': int(np.count_nonzero(reales)),
+    }
+
+def _auc_por_rangos(rangos, es_positivo):
+    """
+    AUC de varias columnas a la vez mediante el estadístico U de Mann-Whitney.
+
+    Args:
+        rangos (np.ndarray): Rangos (con empates promediados) de las puntuaciones, forma (n, c).
+        es_positivo (np.ndarray): Máscara booleana de la clase positiva de cada columna, forma (n, c).
+
+    Returns:
+        np.ndarray: AUC de cada columna, forma (c,).
+    """
+    n_positivos = es_positivo.sum(axis=0)
+    n_negativos = es_positivo.shape[0] - n_positivos
+    suma_rangos = np.where(es_positivo, rangos, 0.0).sum(axis=0)
+    return (suma_rangos - n_positivos * (n_positivos + 1) / 2) / (n_positivos * n_negativos)
+
+# ROC-AUC multiclase a partir de las probabilidades ya calculadas
+def auc_multiclase(y_test, probabilidades, clases):
+    """
+    Calcula el ROC-AUC multiclase uno-contra-resto (OvR) y uno-contra-uno (OvO, Hand & Till)
+    con promedios macro y ponderado, usando rangos vectorizados en lugar de un `roc_auc_score` por clase.
+
+    Solo se consideran las clases presentes en `y_test`. Los valores coinciden con
+    `roc_auc_score(..., multi_class='ovr'|'ovo', average='macro'|'weighted')` de sklearn.
+
+    Args:
+        y_test (array-like): Valores reales de la variable objetivo.
+        probabilidades (np.ndarray): Salida de `predict_proba`, forma (n, n_clases).
+        clases (array-like): Etiquetas de las columnas de `probabilidades` (`modelo.classes_`).
+
+    Returns:
+        dict: 'ovr_macro', 'ovr_ponderado', 'ovo_macro', 'ovo_ponderado', o None si alguna etiqueta
+        de `y_test` no está en `clases` o si `y_test` tiene menos de dos clases (el AUC no está definido).
+    """
+    codigos = pd.Index(clases).get_indexer(np.asarray(y_test).ravel())
+    if (codigos < 0).any():
+        return None
+
+    n = codigos.size
+    conteos = np.bincount(codigos, minlength=len(clases))
+    presentes = np.flatnonzero(conteos)
+    if len(presentes) < 2:
+        return None  # Sin negativos (OvR) ni pares (OvO) no hay AUC
+
+    # Uno contra resto: todas las columnas se ordenan en una sola llamada
+    rangos = rankdata(probabilidades[:, presentes], axis=0)
+    auc_ovr = _auc_por_rangos(rangos, codigos[:, np.newaxis] == presentes[np.newaxis, :])
+    prevalencia = conteos[presentes] / n
+
+    # Uno contra uno: filas agrupadas por clase para extraer cada par sin máscaras sobre n
+    orden = np.argsort(codigos, kind='stable')
+    inicios = np.concatenate([[0], np.cumsum(conteos)])
+    auc_pares, peso_pares = [], []
+    for a, b in combinations(presentes, 2):
+        filas = np.concatenate([orden[inicios[a]:inicios[a + 1]], orden[inicios[b]:inicios[b + 1]]])
+        rangos_par = rankdata(probabilidades[np.ix_(filas, [a, b])], axis=0)
+        es_a = np.arange(filas.size) < conteos[a]
+        auc_par = _auc_por_rangos(rangos_par, np.column_stack([es_a, ~es_a]))
+        auc_pares.append(auc_par.mean())
+        peso_pares.append(filas.size / n)
+
+    return {
+        'ovr_macro': float(auc_ovr.mean()),
+        'ovr_ponderado': float(np.average(auc_ovr, weights=prevalencia)),
+        'ovo_macro': float(np.mean(auc_pares)),
+        'ovo_ponderado': float(np.average(auc_pares, weights=peso_pares)),
+    }
+
 # Función para calcular métricas de clasificación
-def obtener_metricas(nombre, transformacion, descripcion, y_test, modelo, X_test, X_train, y_train, df=None):
+def obtener_metricas(nombre, transformacion, descripcion, y_test, modelo, X_test, X_train, y_train, df=None,
+                     n_jobs=None, usar_cache=True, usar_probabilidades=False):
     """
     Calcula métricas de clasificación y las almacena en un DataFrame.
 
@@ -20,26 +245,44 @@ def obtener_metricas(nombre, transformacion, descripcion, y_test, modelo, X_test
         X_test (array-like): Datos de prueba.
         X_train (array-like): Datos de entrenamiento.
         y_train (array-like): Etiquetas de entrenamiento.
-        df (pd.DataFrame, opcional): DataFrame existente para almacenar las métricas calculadas.
+        df (pd.DataFrame o ResultsCollector, opcional): DataFrame existente o colector de resultados
+            (ver `ML/fx_results_collector.py`) donde almacenar las métricas calculadas.
+        n_jobs (int, opcional): Procesos para la validación cruzada (None = secuencial, -1 = todos los núcleos).
+        usar_cache (bool, opcional): Reutiliza la validación cruzada si el modelo y los datos no han cambiado.
+        usar_probabilidades (bool, opcional): Si es True, ejecuta una única inferencia con `predict_proba`,
+            obtiene `y_pred` como la clase de mayor probabilidad y calcula también el ROC-AUC multiclase
+            (OvR y OvO, macro y ponderado).
 
     Returns:
-        pd.DataFrame: DataFrame actualizado con las métricas calculadas.
+        pd.DataFrame: DataFrame actualizado con las métricas calculadas (o el propio colector si se pasó uno).
     """
     # Realizar predicciones
-    y_pred = modelo.predict(X_test)
+    if usar_probabilidades:
+        probabilidades = modelo.predict_proba(X_test)  # Única pasada de inferencia
+        y_pred = np.asarray(modelo.classes_)[np.argmax(probabilidades, axis=1)]
+    else:
+        probabilidades = None
+        y_pred = modelo.predict(X_test)
 
-    # Calcular métricas básicas
-    exactitud = round(accuracy_score(y_test, y_pred), 2)  # Porcentaje de predicciones correctas
-    puntuaciones = cross_val_score(modelo, X_train, y_train, cv=5)  # Validación cruzada
+    # Calcular métricas básicas desde una única matriz de confusión
+    confusion = metricas_matriz_confusion(y_test, y_pred)
+    exactitud = round(confusion['exactitud'], 2)  # Porcentaje de predicciones correctas
+    puntuaciones = validacion_cruzada(modelo, X_train, y_train, cv=5, n_jobs=n_jobs, usar_cache=usar_cache)  # Validación cruzada
     exactitud_CVS = "%0.2f (+/- %0.2f)" % (puntuaciones.mean(), puntuaciones.std() * 2)  # Promedio y rango
-    precision_promedio = round(np.mean(precision_score(y_test, y_pred, average=None)), 2)  # Promedio de precisión
-    recall_promedio = round(np.mean(recall_score(y_test, y_pred, average=None)), 2)  # Promedio de recall
-    puntuacion_f1_promedio = round(np.mean(f1_score(y_test, y_pred, average=None)), 2)  # Promedio de F1
-    cohen_kappa = round(cohen_kappa_score(y_test, y_pred), 2)  # Índice Cohen Kappa
+    precision_promedio = round(np.mean(confusion['precision']), 2)  # Promedio de precisión
+    recall_promedio = round(np.mean(confusion['recall']), 2)  # Promedio de recall
+    puntuacion_f1_promedio = round(np.mean(confusion['f1']), 2)  # Promedio de F1
+    cohen_kappa = round(confusion['cohen_kappa'], 2)  # Índice Cohen Kappa
 
     # Calcular ROC-AUC para problemas binarios
-    if len(np.unique(y_test)) == 2:
-        roc_auc = round(roc_auc_score(y_test, modelo.predict_proba(X_test)[:, 1]), 2)  # Usa probabilidades si están disponibles
+    auc_multi = None
+    if confusion['n_clases_reales'] == 2:
+        if probabilidades is None:
+            probabilidades = modelo.predict_proba(X_test)
+        roc_auc = round(roc_auc_score(y_test, probabilidades[:, 1]), 2)  # Usa probabilidades si están disponibles
+    elif probabilidades is not None:
+        auc_multi = auc_multiclase(y_test, probabilidades, modelo.classes_)  # Multiclase sin nueva inferencia
+        roc_auc = round(auc_multi['ovr_macro'], 2) if auc_multi else "N/A"
     else:
         roc_auc = "N/A"  # No aplicable para multiclase sin binarización
 
@@ -57,6 +300,16 @@ def obtener_metricas(nombre, transformacion, descripcion, y_test, modelo, X_test
         "ROC_AUC": roc_auc
     }
 
+    # Variantes multiclase del ROC-AUC (solo con usar_probabilidades=True)
+    if auc_multi:
+        metrics["ROC_AUC_OvR_Ponderado"] = round(auc_multi['ovr_ponderado'], 2)
+        metrics["ROC_AUC_OvO_Macro"] = round(auc_multi['ovo_macro'], 2)
+        metrics["ROC_AUC_OvO_Ponderado"] = round(auc_multi['ovo_ponderado'], 2)
+
+    # Con un colector de resultados se agrega la fila sin copiar la tabla acumulada
+    if hasattr(df, 'to_dataframe'):
+        return df.add(metrics)
+
     # Si no existe el DataFrame, inicializarlo
     if df is None:
         columnas = list(metrics.keys())
@@ -79,6 +332,10 @@ def obtener_metricas(nombre, transformacion, descripcion, y_test, modelo, X_test
 #    - Proporciona el promedio y la desviación estándar de la exactitud en validación cruzada.
 #    - Más alto es mejor, con menor desviación indicando mayor estabilidad.
 #    - Útil para evaluar la generalización del modelo.
+#    - Es el paso más costoso (reentrena el modelo 5 veces): usa `n_jobs` para repartir los folds entre procesos.
+#      Con `usar_cache=True` el resultado se reutiliza mientras no cambien los hiperparámetros ni los datos,
+#      siempre que el modelo y la validación sean reproducibles (`random_state` fijo si hay aleatoriedad).
+#      La caché es LRU (`TAMANO_CACHE_CV` entradas) y se vacía con `limpiar_cache_cv()`.
 
 # 3. Precisión (Precision):
 #    - Rango: 0 a 1 (o 0% a 100%).
@@ -119,6 +376,10 @@ def obtener_metricas(nombre, transformacion, descripcion, y_test, modelo, X_test
 #        - 0.8 a 0.9: Rendimiento excelente.
 #        - > 0.9: Rendimiento excepcional.
 #    - Más alto es mejor. Un valor cercano a 1 indica que el modelo distingue perfectamente entre clases.
+#    - Con `usar_probabilidades=True` se calcula también en multiclase: `ROC_AUC` es el promedio macro
+#      uno-contra-resto y se añaden las columnas OvR ponderado y OvO (Hand & Till) macro y ponderado.
+#      La inferencia se hace una sola vez; `y_pred` es el argmax de `predict_proba`, que en algunos modelos
+#      (p. ej. SVC con probability=True) puede diferir ligeramente de `predict`.
 
 # Notas adicionales:
 # - Las métricas ideales dependen del problema y del contexto.
@@ -0,0 +1,30 @@
+# Importaciones necesarias
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import roc_auc_score
+from fx_classification_metrics import auc_multiclase, obtener_metricas
+
+def _modelo_tres_clases():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(90, 4))
+    y = np.repeat([0, 1, 2], 30)
+    X[:, 0] += y  # Clases separables en parte por la primera columna
+    return LogisticRegression(random_state=0).fit(X, y), X, y
+
+def test_auc_multiclase_coincide_con_sklearn():
+    modelo, X, y = _modelo_tres_clases()
+    probabilidades = modelo.predict_proba(X)
+    auc = auc_multiclase(y, probabilidades, modelo.classes_)
+    assert np.isclose(auc['ovr_macro'], roc_auc_score(y, probabilidades, multi_class='ovr', average='macro'))
+    assert np.isclose(auc['ovo_ponderado'], roc_auc_score(y, probabilidades, multi_class='ovo', average='weighted'))
+
+def test_auc_multiclase_con_una_sola_clase_devuelve_none():
+    modelo, X, y = _modelo_tres_clases()
+    assert auc_multiclase(y[y == 1], modelo.predict_proba(X[y == 1]), modelo.classes_) is None
+
+def test_obtener_metricas_con_una_sola_clase_en_test():
+    modelo, X, y = _modelo_tres_clases()
+    df = obtener_metricas('modelo', 'ninguna', 'una clase', y[y == 1], modelo, X[y == 1], X, y,
+                          usar_probabilidades=True)
+    assert df.loc[0, 'ROC_AUC'] == "N/A"
+    assert 'ROC_AUC_OvO_Macro' not in df.columns
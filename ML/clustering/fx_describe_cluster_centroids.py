@@ -1,105 +1,179 @@
 # Importaciones necesarias
-import numpy as np
 import pandas as pd
 from sklearn.cluster import KMeans
 from sklearn.metrics.pairwise import euclidean_distances
 
-def describe_clusters(df_data, km):
+# Columnas por defecto (adaptar a cada conjunto de datos)
+CONTINUOUS_COLS = ['continuous_feature_1', 'continuous_feature_2', 'continuous_feature_3']
+CATEGORICAL_COLS = ['categorical_feature_1', 'categorical_feature_2', 'categorical_feature_3']
+DISCOUNT_COL = 'discount_feature'  # Columna genérica para valores de descuento
+METRIC_COL = 'metric_column'       # Métrica general (por ejemplo, ingresos)
+
+def profile_clusters(df_data, continuous_cols=CONTINUOUS_COLS, categorical_cols=CATEGORICAL_COLS,
+                     discount_col=DISCOUNT_COL, metric_col=METRIC_COL, cluster_col='cluster'):
     """
-    Describe los clusters generados por un modelo de clustering.
+    Calcula el perfil de todos los clusters con agregaciones agrupadas, sin filtrar por cluster.
+
+    Un único `groupby` (cuyas claves se factorizan una sola vez) produce las estadísticas de la
+    métrica, de las columnas continuas y de descuento y las frecuencias de las categóricas,
+    con coste O(n) en lugar de O(n · k).
 
     Args:
-        df_data (pd.DataFrame): Datos de entrada con asignaciones de cluster.
-        km: Modelo de clustering entrenado (ej., KMeans).
+        df_data (pd.DataFrame): Datos de entrada con la columna de asignación de cluster.
+        continuous_cols (list, opcional): Columnas continuas a describir.
+        categorical_cols (list, opcional): Columnas categóricas a describir.
+        discount_col (str, opcional): Columna de descuento (solo media, mínimo y máximo).
+        metric_col (str, opcional): Columna de la métrica general.
+        cluster_col (str, opcional): Columna con el cluster asignado.
 
     Returns:
-        list: Lista de descripciones de cada cluster.
+        tuple: (profile, top_categories, errors)
+            - profile (pd.DataFrame): Una fila por cluster y columnas MultiIndex (columna, estadístico).
+            - top_categories (pd.DataFrame): Columnas 'cluster', 'column', 'value', 'frequency' con los
+              3 valores más frecuentes de cada columna categórica por cluster.
+            - errors (dict): Columnas continuas cuyas estadísticas no se pudieron calcular, con el mensaje.
+    """
+    grouped = df_data.groupby(cluster_col, sort=True)
+    total_metric = df_data[metric_col].sum()
+
+    # Métrica general: suma, tamaño del cluster, peso y medias (la media por cliente, sobre los valores no nulos)
+    metric = grouped[metric_col].agg(['sum', 'size', 'count'])
+    profile = pd.DataFrame({
+        (metric_col, 'n'): metric['size'],
+        (metric_col, 'sum'): metric['sum'],
+        (metric_col, 'weight_pct'): metric['sum'] / total_metric * 100,
+        (metric_col, 'mean'): metric['sum'] / metric['size'],
+        (metric_col, 'client_pct_mean'): metric['sum'] / metric['count'] / total_metric * 100,
+    })
+
+    # Columnas continuas: todas las estadísticas de todas las columnas a la vez
+    errors = {}
+    stats = [profile]
+    continuous = [col for col in continuous_cols if col in df_data.columns]
+    try:
+        stats.append(_continuous_stats(grouped, continuous))
+    except Exception:
+        # Alguna columna no es numérica: se calcula columna a columna para aislar el error
+        for col in continuous:
+            try:
+                stats.append(_continuous_stats(grouped, [col]))
+            except Exception as e:
+                errors[col] = str(e)
+    if discount_col in df_data.columns:
+        try:
+            discount = grouped[discount_col].agg(['mean', 'min', 'max'])
+            discount.columns = pd.MultiIndex.from_product([[discount_col], discount.columns])
+            stats.append(discount)
+        except Exception as e:
+            errors[discount_col] = str(e)
+    profile = pd.concat(stats, axis=1)
+
+    # Columnas categóricas: conteos por (cluster, valor) normalizados por los no nulos del cluster.
+    # Sin ordenar las claves, los empates quedan en orden de aparición, como con `value_counts`
+    top = []
+    for col in categorical_cols:
+        if col in df_data.columns:
+            counts = df_data.groupby([cluster_col, col], sort=False, observed=True).size()
+            frequency = counts / counts.groupby(level=0).transform('sum')
+            frequency = frequency.sort_values(ascending=False, kind='stable').groupby(level=0, sort=True).head(3)
+            top.append(pd.DataFrame({
+                'cluster': frequency.index.get_level_values(0),
+                'column': col,
+                'value': frequency.index.get_level_values(1),
+                'frequency': frequency.values,
+            }))
+    top_categories = (
+        pd.concat(top, ignore_index=True) if top
+        else pd.DataFrame(columns=['cluster', 'column', 'value', 'frequency'])
+    )
+
+    return profile, top_categories, errors
+
+def _continuous_stats(grouped, cols):
     """
-    # Identificar las columnas continuas y categóricas
-    continuous_cols = ['continuous_feature_1', 'continuous_feature_2', 'continuous_feature_3']
-    categorical_cols = ['categorical_feature_1', 'categorical_feature_2', 'categorical_feature_3']
-    discount_col = 'discount_feature'  # Columna genérica para valores de descuento
+    Media, mediana, mínimo, máximo y deciles 10/90 por cluster de las columnas `cols`.
+    """
+    if not cols:
+        return pd.DataFrame(index=grouped.size().index)
+    basic = grouped[cols].agg(['mean', 'median', 'min', 'max'])
+    deciles = grouped[cols].quantile([0.1, 0.9]).unstack()
+    deciles.columns = pd.MultiIndex.from_tuples([(col, f"q{int(q * 100)}") for col, q in deciles.columns])
+    return pd.concat([basic, deciles], axis=1)
+
+def render_cluster_descriptions(profile, top_categories, errors=None, continuous_cols=CONTINUOUS_COLS,
+                                categorical_cols=CATEGORICAL_COLS, discount_col=DISCOUNT_COL, metric_col=METRIC_COL):
+    """
+    Genera las descripciones de texto de cada cluster a partir del perfil de `profile_clusters`.
 
+    Returns:
+        list: Lista de descripciones de cada cluster.
+    """
+    errors = errors or {}
+    top_by_cluster = {cluster: rows for cluster, rows in top_categories.groupby('cluster', sort=False)}
     descriptions = []
-    centroids = km.cluster_centers_
-    
-    # Calcular el total de una métrica general (por ejemplo, ingresos)
-    total_metric = df_data['metric_column'].sum()
-    
-    for cluster in np.unique(df_data['cluster']):
-        # Filtrar los datos del clúster actual
-        cluster_data = df_data[df_data['cluster'] == cluster]
-        n_records = len(cluster_data)
+
+    for cluster, row in profile.iterrows():
+        n_records = int(row[(metric_col, 'n')])
         description = f"Cluster {cluster} (n={n_records}): \n"
-        
-        # Calcular la suma de la métrica del cluster
-        cluster_metric = cluster_data['metric_column'].sum()
-        description += f" - Suma de la métrica del cluster: {cluster_metric:.2f}\n"
-        
-        # Calcular el peso del cluster
-        cluster_weight = (cluster_metric / total_metric) * 100
-        description += f" - Peso del cluster: {cluster_metric:.2f} ({cluster_weight:.2f}%)\n"
-        
-        # Calcular la métrica media por cliente del cluster
-        cluster_metric_avg = cluster_metric / n_records
-        description += f" - Métrica media por cliente del cluster: {cluster_metric_avg:.2f}\n"
-        
-        # Calcular el porcentaje que representa cada cliente respecto al total
-        cluster_data['metric_percentage'] = (cluster_data['metric_column'] / total_metric) * 100
-        metric_percentage_avg = cluster_data['metric_percentage'].mean()
-        description += f" - % de la métrica que representa cada cliente del cluster respecto al total: {metric_percentage_avg:.2f}%\n"
+        description += f" - Suma de la métrica del cluster: {row[(metric_col, 'sum')]:.2f}\n"
+        description += f" - Peso del cluster: {row[(metric_col, 'sum')]:.2f} ({row[(metric_col, 'weight_pct')]:.2f}%)\n"
+        description += f" - Métrica media por cliente del cluster: {row[(metric_col, 'mean')]:.2f}\n"
+        description += f" - % de la métrica que representa cada cliente del cluster respecto al total: {row[(metric_col, 'client_pct_mean')]:.2f}%\n"
 
         # Describir las características continuas
-        continuous_description = ""
         for col in continuous_cols:
-            if col in df_data.columns:
-                try:
-                    col_min = cluster_data[col].min()
-                    col_max = cluster_data[col].max()
-                    col_mean = cluster_data[col].mean()
-                    col_median = cluster_data[col].median()
-                    col_decile = cluster_data[col].quantile([0.1, 0.9])
-                    
-                    continuous_description += (
-                        f" - {col}: (media: {col_mean:.2f}, mediana: {col_median:.2f}, "
-                        f"min: {col_min:.2f}, max: {col_max:.2f}, decil 10-90: {col_decile[0.1]:.2f}-{col_decile[0.9]:.2f})\n"
-                    )
-                except Exception as e:
-                    continuous_description += f" - {col}: Error al calcular estadísticas ({str(e)})\n"
-        
+            if col in errors:
+                description += f" - {col}: Error al calcular estadísticas ({errors[col]})\n"
+            elif (col, 'mean') in row.index:
+                description += (
+                    f" - {col}: (media: {row[(col, 'mean')]:.2f}, mediana: {row[(col, 'median')]:.2f}, "
+                    f"min: {row[(col, 'min')]:.2f}, max: {row[(col, 'max')]:.2f}, "
+                    f"decil 10-90: {row[(col, 'q10')]:.2f}-{row[(col, 'q90')]:.2f})\n"
+                )
+
         # Tratar la columna de descuento si existe
-        if discount_col in df_data.columns:
-            try:
-                discount_mean = cluster_data[discount_col].mean()
-                discount_min = cluster_data[discount_col].min()
-                discount_max = cluster_data[discount_col].max()
-                continuous_description += f" - {discount_col}: (media: {discount_mean:.2f}, min: {discount_min:.2f}, max: {discount_max:.2f})\n"
-            except Exception as e:
-                continuous_description += f" - {discount_col}: Error al calcular estadísticas ({str(e)})\n"
-        description += continuous_description
+        if discount_col in errors:
+            description += f" - {discount_col}: Error al calcular estadísticas ({errors[discount_col]})\n"
+        elif (discount_col, 'mean') in row.index:
+            description += (
+                f" - {discount_col}: (media: {row[(discount_col, 'mean')]:.2f}, "
+                f"min: {row[(discount_col, 'min')]:.2f}, max: {row[(discount_col, 'max')]:.2f})\n"
+            )
 
         # Describir las características categóricas
-        categorical_description = ""
-        for col in categorical_cols:
-            if col in df_data.columns:
-                value_counts = cluster_data[col].value_counts(normalize=True)
-                for value, freq in value_counts.head(3).items():
-                    categorical_description += f" - {col}: valor {value} (frecuencia: {freq:.2%})\n"
-        description += categorical_description
-
-        # Añadir la descripción del cluster a la lista de descripciones
+        cluster_top = top_by_cluster.get(cluster)
+        if cluster_top is not None:
+            for col in categorical_cols:
+                for value, freq in cluster_top.loc[cluster_top['column'] == col, ['value', 'frequency']].itertuples(index=False):
+                    description += f" - {col}: valor {value} (frecuencia: {freq:.2%})\n"
+
         descriptions.append(description)
 
     return descriptions
 
+def describe_clusters(df_data, km):
+    """
+    Describe los clusters generados por un modelo de clustering.
+
+    Args:
+        df_data (pd.DataFrame): Datos de entrada con asignaciones de cluster.
+        km: Modelo de clustering entrenado (ej., KMeans).
+
+    Returns:
+        list: Lista de descripciones de cada cluster.
+    """
+    # Perfil de todos los clusters en una pasada agrupada y descripciones a partir de él
+    profile, top_categories, errors = profile_clusters(df_data)
+    return render_cluster_descriptions(profile, top_categories, errors)
+
 # Notas sobre el uso:
 # 1. Estructura de datos esperada:
 #    - El DataFrame `df_data` debe contener una columna llamada `cluster`, que indica el cluster asignado para cada fila.
 #    - Debe incluir una columna de métrica continua para el análisis general (configurable como `metric_column`).
-#    - Las columnas continuas y categóricas deben definirse en las listas `continuous_cols` y `categorical_cols`, respectivamente.
+#    - Las columnas continuas y categóricas deben definirse en las listas `CONTINUOUS_COLS` y `CATEGORICAL_COLS`, respectivamente.
 
 # 2. Adaptaciones requeridas:
-#    - Cambia los nombres en `continuous_cols`, `categorical_cols` y `discount_col` para que coincidan con tu conjunto de datos.
+#    - Cambia los nombres en `CONTINUOUS_COLS`, `CATEGORICAL_COLS`, `DISCOUNT_COL` y `METRIC_COL` para que coincidan con tu conjunto de datos.
 #    - Asegúrate de que las columnas necesarias existan en el DataFrame `df_data`.
 
 # 3. Modelo de clustering:
@@ -109,3 +183,8 @@ def describe_clusters(df_data, km):
 # 4. Salida:
 #    - Devuelve una lista de strings, donde cada string contiene una descripción detallada de un cluster.
 #    - Las descripciones incluyen estadísticas continuas, categóricas y porcentajes sobre la métrica principal.
+
+# 5. Perfil estructurado:
+#    - `profile_clusters` devuelve las mismas estadísticas como tablas (una fila por cluster) para analizarlas
+#      o exportarlas; `render_cluster_descriptions` genera el texto a partir de ellas.
+#    - Las columnas también pueden pasarse como argumentos a `profile_clusters` y `render_cluster_descriptions`.
\ No newline at end of file
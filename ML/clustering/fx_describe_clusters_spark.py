@@ -0,0 +1,171 @@
+# Importaciones necesarias
+import pandas as pd
+from pyspark.sql import functions as F
+from pyspark.sql.types import NumericType
+from pyspark.sql.window import Window
+from fx_describe_cluster_centroids import (
+    CONTINUOUS_COLS, CATEGORICAL_COLS, DISCOUNT_COL, METRIC_COL, render_cluster_descriptions
+)
+
+def profile_clusters_spark(sdf, continuous_cols=CONTINUOUS_COLS, categorical_cols=CATEGORICAL_COLS,
+                           discount_col=DISCOUNT_COL, metric_col=METRIC_COL, cluster_col='cluster',
+                           percentile_accuracy=10000):
+    """
+    Versión distribuida de `profile_clusters` para datos que viven en Spark.
+
+    Todas las estadísticas se calculan con agregaciones `groupBy` en el clúster y solo se
+    recoge en el driver el resumen por cluster (k filas), sin `toPandas()` de los datos:
+      - Métrica, columnas continuas y de descuento: un único `groupBy(cluster).agg(...)`, con
+        mediana y deciles aproximados mediante `percentile_approx`.
+      - Categóricas: las columnas se despliegan en filas (cluster, columna, valor) con `explode`,
+        de modo que un único `groupBy(...).count()` lee los datos una sola vez para todas ellas,
+        y el top 3 por cluster se obtiene con `row_number` sobre una ventana.
+
+    Las filas sin cluster asignado no aparecen en el perfil, pero su métrica sí cuenta en el total
+    (igual que en `profile_clusters`), de modo que `weight_pct` se calcula sobre toda la métrica.
+
+    Args:
+        sdf (pyspark.sql.DataFrame): Datos con la columna de asignación de cluster.
+        continuous_cols (list, opcional): Columnas continuas a describir.
+        categorical_cols (list, opcional): Columnas categóricas a describir.
+        discount_col (str, opcional): Columna de descuento (solo media, mínimo y máximo).
+        metric_col (str, opcional): Columna de la métrica general.
+        cluster_col (str, opcional): Columna con el cluster asignado.
+        percentile_accuracy (int, opcional): Precisión de `percentile_approx` (error relativo ~ 1/precisión).
+
+    Returns:
+        tuple: (profile, top_categories, errors) con el mismo formato que `profile_clusters`.
+    """
+    numeric = {field.name for field in sdf.schema.fields if isinstance(field.dataType, NumericType)}
+    errors = {}
+
+    # Métrica general, columnas continuas y descuento en una sola agregación
+    aggregations = [
+        F.count(F.lit(1)).alias('n'), F.count(metric_col).alias('metric_count'), F.sum(metric_col).alias('metric_sum'),
+    ]
+    continuous = []
+    for col in continuous_cols:
+        if col not in sdf.columns:
+            continue
+        if col not in numeric:
+            errors[col] = f"la columna no es numérica ({sdf.schema[col].dataType.simpleString()})"
+            continue
+        continuous.append(col)
+        aggregations += [
+            F.mean(col).alias(f"{col}__mean"),
+            F.min(col).alias(f"{col}__min"),
+            F.max(col).alias(f"{col}__max"),
+            F.percentile_approx(col, [0.1, 0.5, 0.9], percentile_accuracy).alias(f"{col}__pct"),
+        ]
+    has_discount = discount_col in sdf.columns
+    if has_discount and discount_col not in numeric:
+        errors[discount_col] = f"la columna no es numérica ({sdf.schema[discount_col].dataType.simpleString()})"
+        has_discount = False
+    if has_discount:
+        aggregations += [
+            F.mean(discount_col).alias(f"{discount_col}__mean"),
+            F.min(discount_col).alias(f"{discount_col}__min"),
+            F.max(discount_col).alias(f"{discount_col}__max"),
+        ]
+
+    # Sin filtrar el cluster nulo: su grupo aporta la métrica de las filas sin asignar al total
+    rows = (
+        sdf.groupBy(cluster_col).agg(*aggregations)
+        .orderBy(cluster_col)
+        .collect()  # k filas (+1 si hay filas sin cluster)
+    )
+    summary = [row for row in rows if row[cluster_col] is not None]
+
+    index = pd.Index([row[cluster_col] for row in summary], name=cluster_col)
+    n = pd.Series([row['n'] for row in summary], index=index, dtype='int64')
+    metric_count = pd.Series([row['metric_count'] for row in summary], index=index, dtype='int64')
+    metric_sum = pd.Series([row['metric_sum'] for row in summary], index=index, dtype='float64')
+    total_metric = sum(row['metric_sum'] or 0.0 for row in rows)  # Total de todas las filas, sin otra pasada
+
+    columns = {
+        (metric_col, 'n'): n,
+        (metric_col, 'sum'): metric_sum,
+        (metric_col, 'weight_pct'): metric_sum / total_metric * 100,
+        (metric_col, 'mean'): metric_sum / n,
+        (metric_col, 'client_pct_mean'): metric_sum / metric_count / total_metric * 100,  # Sobre los no nulos
+    }
+    for col in continuous:
+        percentiles = [row[f"{col}__pct"] or [None, None, None] for row in summary]
+        columns[(col, 'mean')] = pd.Series([row[f"{col}__mean"] for row in summary], index=index, dtype='float64')
+        columns[(col, 'median')] = pd.Series([p[1] for p in percentiles], index=index, dtype='float64')
+        columns[(col, 'min')] = pd.Series([row[f"{col}__min"] for row in summary], index=index, dtype='float64')
+        columns[(col, 'max')] = pd.Series([row[f"{col}__max"] for row in summary], index=index, dtype='float64')
+        columns[(col, 'q10')] = pd.Series([p[0] for p in percentiles], index=index, dtype='float64')
+        columns[(col, 'q90')] = pd.Series([p[2] for p in percentiles], index=index, dtype='float64')
+    if has_discount:
+        for stat in ('mean', 'min', 'max'):
+            columns[(discount_col, stat)] = pd.Series(
+                [row[f"{discount_col}__{stat}"] for row in summary], index=index, dtype='float64'
+            )
+    profile = pd.DataFrame(columns)
+
+    # Categóricas: frecuencias por cluster y top 3 con una ventana, todas las columnas en una sola lectura
+    categorical = [col for col in categorical_cols if col in sdf.columns]
+    if categorical:
+        melted = F.explode(F.array(*[
+            F.struct(F.lit(col).alias('column'), F.col(col).cast('string').alias('value')) for col in categorical
+        ])).alias('pair')
+        counts = (
+            sdf.where(F.col(cluster_col).isNotNull())
+            .select(cluster_col, melted)
+            .select(cluster_col, 'pair.column', 'pair.value')
+            .where(F.col('value').isNotNull())
+            .groupBy(cluster_col, 'column', 'value').count()
+        )
+
+        by_cluster = Window.partitionBy(cluster_col, 'column')
+        ranked = Window.partitionBy(cluster_col, 'column').orderBy(F.desc('count'), F.asc('value'))
+        top_rows = (
+            counts
+            .withColumn('frequency', F.col('count') / F.sum('count').over(by_cluster))
+            .withColumn('rank', F.row_number().over(ranked))
+            .where(F.col('rank') <= 3)
+            .orderBy(cluster_col, 'column', 'rank')
+            .collect()  # como máximo k · 3 filas por columna
+        )
+        top_categories = pd.DataFrame(
+            [(row[cluster_col], row['column'], row['value'], row['frequency']) for row in top_rows],
+            columns=['cluster', 'column', 'value', 'frequency'],
+        )
+    else:
+        top_categories = pd.DataFrame(columns=['cluster', 'column', 'value', 'frequency'])
+
+    return profile, top_categories, errors
+
+def describe_clusters_spark(sdf, km=None, **kwargs):
+    """
+    Equivalente a `describe_clusters` para un DataFrame de Spark con la columna `cluster`.
+
+    Args:
+        sdf (pyspark.sql.DataFrame): Datos de entrada con asignaciones de cluster.
+        km (opcional): Modelo de clustering (no se usa; se mantiene por simetría con `describe_clusters`).
+        **kwargs: Argumentos opcionales de `profile_clusters_spark` (columnas, precisión de percentiles).
+
+    Returns:
+        list: Lista de descripciones de cada cluster.
+    """
+    profile, top_categories, errors = profile_clusters_spark(sdf, **kwargs)
+    render_kwargs = {key: kwargs[key] for key in ('continuous_cols', 'categorical_cols', 'discount_col', 'metric_col')
+                     if key in kwargs}
+    return render_cluster_descriptions(profile, top_categories, errors, **render_kwargs)
+
+# Notas sobre el uso:
+# -------------------
+# 1. Entrada esperada:
+#    - El DataFrame de Spark debe tener la columna `cluster` (p. ej. la columna `prediction` de un modelo
+#      de `pyspark.ml`, renombrada) y las columnas configuradas en `fx_describe_cluster_centroids.py`.
+#
+# 2. Diferencias con la versión pandas:
+#    - La mediana y los deciles son aproximados (`percentile_approx`); aumenta `percentile_accuracy` si necesitas
+#      más precisión.
+#    - Los valores categóricos se comparan como texto y los empates en frecuencia se ordenan alfabéticamente.
+#    - Solo viajan al driver k filas de resumen y como máximo 3 filas por cluster y columna categórica.
+#    - Las columnas categóricas se despliegan en pares (columna, valor) antes de agrupar: una sola lectura de los
+#      datos para todas ellas, en lugar de un `groupBy` por columna unido con `unionByName`.
+#    - Las filas con cluster nulo no forman un cluster del perfil, pero su métrica se incluye en el total, así que
+#      los `weight_pct` de los clusters suman menos de 100 si hay filas sin asignar (como en la versión pandas).
\ No newline at end of file
@@ -1,16 +1,412 @@
 # Importaciones necesarias
 import numpy as np
 import pandas as pd
-from sklearn.metrics import silhouette_score, davies_bouldin_score, calinski_harabasz_score
 from sklearn.cluster import KMeans
 from sklearn.ensemble import IsolationForest
 from sklearn.neighbors import LocalOutlierFactor
-from scipy.spatial.distance import pdist
+from scipy.spatial.distance import pdist, squareform
 from scipy.cluster.hierarchy import linkage, cophenet
 from sklearn.metrics.pairwise import euclidean_distances
+from scipy import sparse
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+import hashlib
+import os
+
+SILHOUETTE_MODES = ('exact', 'sampled', 'simplified')
+
+def _resolve_n_jobs(n_jobs):
+    """
+    Traduce `n_jobs` (None, -1 o un entero) al número de hilos a usar.
+    """
+    if n_jobs is None:
+        return 1
+    if n_jobs < 0:
+        return max(1, (os.cpu_count() or 1) + 1 + n_jobs)
+    return max(1, n_jobs)
+
+# Caché de geometría compartida por las métricas de calidad
+class ClusterGeometry:
+    """
+    Calcula una sola vez la geometría de un clustering y alimenta con ella todas las métricas.
+
+    Los centroides (media de cada cluster), la distancia de cada punto a su centroide y,
+    si cabe en el presupuesto de memoria, la matriz de distancias condensada (`pdist`) se
+    calculan una vez por llamada y se reutilizan en Silhouette, Davies-Bouldin,
+    Calinski-Harabasz y en el linkage/cophenet del clustering jerárquico.
+
+    Cuando la matriz condensada no cabe en `memory_budget_mb`, las distancias se calculan
+    por bloques de filas cuyo tamaño también respeta el presupuesto.
+
+    Args:
+        data (array-like): Datos utilizados para ajustar el modelo, forma (n, d).
+        labels (array-like): Etiqueta de cluster de cada punto.
+        memory_budget_mb (float, opcional): Memoria máxima para matrices de distancias, en MB.
+    """
+
+    def __init__(self, data, labels, memory_budget_mb=1024):
+        self.X = np.ascontiguousarray(data, dtype=np.float64)
+        self.codes, self.clusters = pd.factorize(np.asarray(labels).ravel(), sort=True)
+        self.n = self.X.shape[0]
+        self.k = len(self.clusters)
+        if not 1 < self.k < self.n:
+            raise ValueError(f"Number of labels is {self.k}. Valid values are 2 to n_samples - 1 (inclusive)")
+
+        self.memory_budget = memory_budget_mb * 1024 ** 2
+        self.counts = np.bincount(self.codes, minlength=self.k)
+
+        # Matriz indicadora dispersa (n × k): sumas por cluster con un solo producto
+        self._onehot = sparse.csr_matrix(
+            (np.ones(self.n), (np.arange(self.n), self.codes)), shape=(self.n, self.k)
+        )
+        self.centroids = np.asarray(self._onehot.T @ self.X) / self.counts[:, np.newaxis]
+        self.global_mean = self.X.mean(axis=0)
+
+        # Distancia de cada punto al centroide de su cluster, por bloques
+        self.centroid_distances = np.empty(self.n)
+        for start, stop in self._row_blocks(self.X.shape[1]):
+            diff = self.X[start:stop] - self.centroids[self.codes[start:stop]]
+            self.centroid_distances[start:stop] = np.sqrt(np.einsum('ij,ij->i', diff, diff))
+
+        self._condensed = None
+
+    def _row_blocks(self, row_width, n_jobs=1):
+        """
+        Genera intervalos de filas cuyo bloque de `row_width` valores de 8 bytes cabe en el presupuesto
+        (con margen para los temporales de índices y máscaras), repartido entre `n_jobs` hilos.
+        """
+        rows = max(1, int(self.memory_budget // (row_width * 8 * 6 * n_jobs)))
+        for start in range(0, self.n, rows):
+            yield start, min(start + rows, self.n)
+
+    @property
+    def condensed_affordable(self):
+        return self.n * (self.n - 1) // 2 * 8 <= self.memory_budget
+
+    def condensed_distances(self, force=False):
+        """
+        Devuelve la matriz de distancias condensada, calculándola una sola vez.
+
+        Args:
+            force (bool, opcional): Calcularla aunque supere el presupuesto de memoria
+                (p. ej. para `linkage`, que la necesita completa).
+
+        Returns:
+            np.ndarray o None: Distancias euclídeas condensadas, o None si no caben en el presupuesto.
+        """
+        if self._condensed is None and (force or self.condensed_affordable):
+            self._condensed = pdist(self.X)
+        return self._condensed
+
+    def distance_rows(self, rows):
+        """
+        Filas `rows` (array de índices) de la matriz de distancias completa, desde la caché condensada si existe.
+        """
+        condensed = self.condensed_distances()
+        if condensed is None:
+            return euclidean_distances(self.X[rows], self.X)
+
+        i = rows[:, np.newaxis]
+        j = np.arange(self.n)[np.newaxis, :]
+        low, high = np.minimum(i, j), np.maximum(i, j)
+        index = self.n * low - low * (low + 1) // 2 + (high - low - 1)
+        block = condensed[np.clip(index, 0, condensed.size - 1)]
+        block[low == high] = 0.0
+        return block
+
+    def silhouette_samples(self, rows):
+        """
+        Silueta exacta (frente a todos los puntos) de las filas `rows`.
+        """
+        cluster_sums = np.asarray(self.distance_rows(rows) @ self._onehot)  # (filas, k)
+        own = self.codes[rows]
+        positions = np.arange(rows.size)
+
+        own_size = self.counts[own]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            intra = cluster_sums[positions, own] / (own_size - 1)
+            cluster_sums[positions, own] = np.inf
+            inter = (cluster_sums / self.counts).min(axis=1)
+            scores = (inter - intra) / np.maximum(intra, inter)
+        scores[own_size == 1] = 0.0  # Clusters de un solo punto: silueta 0 (como sklearn)
+        return np.nan_to_num(scores)
+
+    def silhouette(self, n_jobs=None):
+        """
+        Coeficiente de Silhouette exacto, calculado por bloques de filas con memoria acotada.
+
+        Args:
+            n_jobs (int, opcional): Hilos que procesan bloques en paralelo (-1 = todos los núcleos).
+                El presupuesto de memoria se reparte entre ellos.
+        """
+        n_jobs = _resolve_n_jobs(n_jobs)
+        blocks = [np.arange(start, stop) for start, stop in self._row_blocks(self.n, n_jobs)]
+        if n_jobs == 1:
+            scores = [self.silhouette_samples(rows) for rows in blocks]
+        else:
+            # NumPy/BLAS liberan el GIL en los productos de distancias: los hilos escalan sin copiar datos
+            with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+                scores = list(executor.map(self.silhouette_samples, blocks))
+        return float(np.concatenate(scores).mean())
+
+    def silhouette_sampled(self, sample_size=10000, random_state=None, n_jobs=None):
+        """
+        Estimación de la silueta con un muestreo estratificado por cluster.
+
+        Se toma una muestra proporcional al tamaño de cada cluster (al menos 2 puntos por cluster)
+        y la silueta de cada punto muestreado se calcula de forma exacta frente a todos los datos,
+        con coste O(sample_size · n) en lugar de O(n²).
+
+        Args:
+            sample_size (int, opcional): Tamaño aproximado de la muestra.
+            random_state (int, opcional): Semilla del muestreo.
+            n_jobs (int, opcional): Hilos para el cálculo por bloques.
+
+        Returns:
+            tuple: (estimación, error estándar) de la silueta media.
+        """
+        if sample_size >= self.n:
+            return self.silhouette(n_jobs), 0.0
+
+        rng = np.random.default_rng(random_state)
+        weights = self.counts / self.n
+        allocation = np.minimum(self.counts, np.maximum(2, np.round(weights * sample_size).astype(int)))
+        order = np.argsort(self.codes, kind='stable')
+        starts = np.concatenate([[0], np.cumsum(self.counts)])
+        strata = [rng.choice(order[starts[c]:starts[c + 1]], size=allocation[c], replace=False) for c in range(self.k)]
+
+        n_jobs = _resolve_n_jobs(n_jobs)
+        sample = np.concatenate(strata)
+        rows_per_block = max(1, int(self.memory_budget // (self.n * 8 * 6 * n_jobs)))
+        blocks = [sample[i:i + rows_per_block] for i in range(0, sample.size, rows_per_block)]
+        with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+            scores = np.concatenate(list(executor.map(self.silhouette_samples, blocks)))
+
+        # Media y varianza del estimador estratificado (con corrección por población finita)
+        bounds = np.concatenate([[0], np.cumsum(allocation)])
+        means = np.array([scores[bounds[c]:bounds[c + 1]].mean() for c in range(self.k)])
+        variances = np.array([
+            scores[bounds[c]:bounds[c + 1]].var(ddof=1) if allocation[c] > 1 else 0.0 for c in range(self.k)
+        ])
+        estimate = np.sum(weights * means)
+        variance = np.sum(weights ** 2 * variances / allocation * (1 - allocation / self.counts))
+        return float(estimate), float(np.sqrt(variance))
+
+    def silhouette_simplified(self):
+        """
+        Silueta simplificada basada en centroides: a = distancia al propio centroide,
+        b = distancia al centroide más cercano de otro cluster. Coste O(n · k).
+        """
+        scores = np.empty(self.n)
+        for start, stop in self._row_blocks(self.k):
+            own = self.codes[start:stop]
+            to_centroids = euclidean_distances(self.X[start:stop], self.centroids)
+            to_centroids[np.arange(stop - start), own] = np.inf
+            intra = self.centroid_distances[start:stop]
+            inter = to_centroids.min(axis=1)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                block_scores = (inter - intra) / np.maximum(intra, inter)
+            block_scores[self.counts[own] == 1] = 0.0
+            scores[start:stop] = np.nan_to_num(block_scores)
+        return float(scores.mean())
+
+    def davies_bouldin(self):
+        """
+        Índice de Davies-Bouldin a partir de los centroides y distancias en caché.
+        """
+        intra = np.bincount(self.codes, weights=self.centroid_distances, minlength=self.k) / self.counts
+        between = euclidean_distances(self.centroids)
+        if np.allclose(intra, 0) or np.allclose(between, 0):
+            return 0.0
+        between[between == 0] = np.inf
+        return float(np.mean(np.max((intra[:, np.newaxis] + intra) / between, axis=1)))
+
+    def within_cluster_ss(self, centers, labels, n_jobs=None):
+        """
+        Suma de cuadrados de cada punto a su centroide asignado en el modelo, por bloques de filas.
+
+        Solo se calcula la distancia al centroide asignado (no a los k centroides), con memoria
+        O(bloque · d) acotada por el presupuesto y bloques repartidos entre `n_jobs` hilos.
+
+        Args:
+            centers (array-like): Centroides del modelo, forma (k, d).
+            labels (array-like): Índice del centroide asignado a cada punto.
+            n_jobs (int, opcional): Hilos que procesan bloques en paralelo (-1 = todos los núcleos).
+
+        Returns:
+            np.ndarray: WCSS de cada centroide, forma (k,).
+        """
+        centers = np.asarray(centers, dtype=np.float64)
+        labels = np.asarray(labels).ravel()
+
+        def block_ss(bounds):
+            start, stop = bounds
+            own = labels[start:stop]
+            diff = self.X[start:stop] - centers[own]
+            return np.bincount(own, weights=np.einsum('ij,ij->i', diff, diff), minlength=len(centers))
+
+        n_jobs = _resolve_n_jobs(n_jobs)
+        blocks = list(self._row_blocks(self.X.shape[1], n_jobs))
+        if n_jobs == 1:
+            return np.sum([block_ss(bounds) for bounds in blocks], axis=0)
+        with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+            return np.sum(list(executor.map(block_ss, blocks)), axis=0)
+
+    def between_cluster_ss(self):
+        """
+        Suma de cuadrados entre clusters: Σ n_k · ‖centroide_k − media global‖².
+        """
+        return float(np.sum(self.counts * np.sum((self.centroids - self.global_mean) ** 2, axis=1)))
+
+    def calinski_harabasz(self):
+        """
+        Índice de Calinski-Harabasz a partir de los centroides y distancias en caché.
+        """
+        extra = self.between_cluster_ss()
+        intra = np.sum(self.centroid_distances ** 2)
+        if intra == 0:
+            return 1.0
+        return float(extra * (self.n - self.k) / (intra * (self.k - 1)))
+
+# Caché LRU de detecciones de anomalías: el resultado solo depende de los datos, no del modelo de clustering
+_anomaly_cache = OrderedDict()
+ANOMALY_CACHE_SIZE = 8  # Conjuntos de datos distintos que se recuerdan como máximo
+
+def count_anomalies(data, method, n_jobs=None, random_state=None):
+    """
+    Cuenta las anomalías de `data` una sola vez por conjunto de datos.
+
+    El detector se ajusta en paralelo (`n_jobs`) y el resultado se guarda en caché con una
+    huella SHA-256 del contenido de los datos, de modo que evaluar k = 2..50 sobre los mismos
+    datos ajusta el detector una única vez. La caché guarda los `ANOMALY_CACHE_SIZE` conjuntos
+    usados más recientemente; Isolation Forest sin `random_state` entero es aleatorio y no se cachea.
+
+    Args:
+        data (np.ndarray): Datos float64 contiguos.
+        method (str): 'isolation_forest' o 'lof' (Local Outlier Factor).
+        n_jobs (int, opcional): Procesos/hilos del detector (-1 = todos los núcleos).
+        random_state (int, opcional): Semilla de Isolation Forest (forma parte de la clave de caché;
+            sin semilla entera el resultado no se guarda).
+
+    Returns:
+        int: Número de puntos marcados como anomalía (-1).
+    """
+    if method == 'isolation_forest':
+        detector = IsolationForest(n_jobs=n_jobs, random_state=random_state)  #      Detección de outliers usando Isolation Forest
+    elif method == 'lof':
+        detector = LocalOutlierFactor(n_jobs=n_jobs)                          #      Outliers usando Local Outlier Factor
+    else:
+        raise ValueError(f"Método de detección de anomalías desconocido: '{method}'")
+    if method == 'isolation_forest' and not isinstance(random_state, (int, np.integer)):
+        return int(np.sum(detector.fit_predict(data) == -1))  # Estocástico: cada llamada ajusta de nuevo
+
+    fingerprint = hashlib.sha256()
+    fingerprint.update(repr((method, data.shape, data.dtype.str, random_state)).encode())
+    fingerprint.update(data.tobytes())
+    key = fingerprint.hexdigest()
+
+    if key in _anomaly_cache:
+        _anomaly_cache.move_to_end(key)
+    else:
+        _anomaly_cache[key] = int(np.sum(detector.fit_predict(data) == -1))
+        if len(_anomaly_cache) > ANOMALY_CACHE_SIZE:
+            _anomaly_cache.popitem(last=False)  # Se descarta el conjunto usado hace más tiempo
+    return _anomaly_cache[key]
+
+def model_linkage_matrix(model):
+    """
+    Matriz de linkage de SciPy a partir del árbol ya calculado por un `AgglomerativeClustering`.
+
+    Requiere `distances_`, disponible si el modelo se ajustó con `compute_distances=True` o con
+    `distance_threshold`.
+
+    Args:
+        model: Modelo de clustering jerárquico entrenado.
+
+    Returns:
+        np.ndarray o None: Matriz (n - 1, 4) de linkage, o None si el modelo no guarda las distancias.
+    """
+    if not hasattr(model, 'children_') or getattr(model, 'distances_', None) is None:
+        return None
+    children = np.asarray(model.children_, dtype=np.int64)
+    n = len(children) + 1
+
+    sizes = np.empty(len(children))
+    leaf_or_size = np.ones(2 * n - 1)  # Tamaño de cada nodo: 1 para las hojas, acumulado para las fusiones
+    for step, (a, b) in enumerate(children):
+        sizes[step] = leaf_or_size[a] + leaf_or_size[b]
+        leaf_or_size[n + step] = sizes[step]
+    return np.column_stack([children, model.distances_, sizes]).astype(np.float64)
+
+def sampled_cophenetic(linkage_matrix, X, sample):
+    """
+    Correlación cophenética estimada sobre los pares de una muestra de puntos.
+
+    Las distancias cophenéticas entre los puntos muestreados se obtienen recorriendo una sola vez
+    las fusiones del árbol completo (la altura de la fusión que los une), sin la matriz n × n.
+
+    Args:
+        linkage_matrix (np.ndarray): Matriz de linkage del árbol completo.
+        X (np.ndarray): Datos, forma (n, d).
+        sample (np.ndarray): Índices de los puntos muestreados.
+
+    Returns:
+        float: Correlación entre las distancias originales y las cophenéticas de los pares muestreados.
+    """
+    n = len(X)
+    position = np.full(n, -1)
+    position[sample] = np.arange(len(sample))
+    coph = np.zeros((len(sample), len(sample)))
+
+    members = {}  # Puntos muestreados bajo cada nodo interno
+    for step, (a, b, height, _) in enumerate(linkage_matrix):
+        a, b = int(a), int(b)
+        left = members.pop(a, []) if a >= n else ([position[a]] if position[a] >= 0 else [])
+        right = members.pop(b, []) if b >= n else ([position[b]] if position[b] >= 0 else [])
+        if left and right:
+            coph[np.ix_(left, right)] = height
+        if left or right:
+            members[n + step] = left + right
+
+    coph_condensed = squareform(np.maximum(coph, coph.T), checks=False)
+    return float(np.corrcoef(pdist(X[sample]), coph_condensed)[0, 1])
+
+def _cophenetic(geometry, model, sample_size, random_state):
+    """
+    Coeficiente cophenético con el árbol del modelo (o un linkage completo si no lo guarda).
+
+    Hasta `sample_size` puntos se usa la matriz condensada compartida; por encima se estima sobre
+    una muestra de puntos.
+    """
+    linkage_matrix = model_linkage_matrix(model)
+    if geometry.n <= sample_size:
+        condensed = geometry.condensed_distances(force=True)  # Una sola pdist para linkage, cophenet y silueta
+        if linkage_matrix is None:
+            linkage_matrix = linkage(condensed, method='complete')
+        return float(cophenet(linkage_matrix, condensed)[0])
+
+    sample = np.sort(np.random.default_rng(random_state).choice(geometry.n, size=sample_size, replace=False))
+    if linkage_matrix is not None:
+        return sampled_cophenetic(linkage_matrix, geometry.X, sample)
+    condensed = pdist(geometry.X[sample])  # Sin árbol del modelo: linkage completo sobre la muestra
+    return float(cophenet(linkage(condensed, method='complete'), condensed)[0])
+
+def _silhouette(geometry, mode, sample_size, random_state, n_jobs):
+    """
+    Calcula la silueta en el modo pedido y devuelve (valor, error estándar).
+    """
+    if mode == 'exact':
+        return geometry.silhouette(n_jobs), 0.0
+    if mode == 'sampled':
+        return geometry.silhouette_sampled(sample_size, random_state, n_jobs)
+    if mode == 'simplified':
+        return geometry.silhouette_simplified(), np.nan
+    raise ValueError(f"silhouette_mode debe ser uno de {SILHOUETTE_MODES}, se recibió '{mode}'")
 
 # Función principal
-def evaluate_clustering(clustering_type, model, data, metrics=None, model_name=None):
+def evaluate_clustering(clustering_type, model, data, metrics=None, model_name=None, memory_budget_mb=1024,
+                        silhouette_mode='exact', silhouette_sample_size=10000, random_state=None, n_jobs=None,
+                        detect_anomalies=True, cophenetic_sample_size=5000):
     """
     Evalúa la calidad de un modelo de clustering mediante diversas métricas.
 
@@ -18,16 +414,28 @@ def evaluate_clustering(clustering_type, model, data, metrics=None, model_name=N
         clustering_type (str): Tipo de clustering ('k' para K-means, 'g' para clustering jerárquico).
         model: Modelo de clustering entrenado (ej., KMeans, AgglomerativeClustering).
         data (array-like): Datos utilizados para ajustar el modelo.
-        metrics (pd.DataFrame, opcional): DataFrame existente para agregar las métricas calculadas.
+        metrics (pd.DataFrame o ResultsCollector, opcional): DataFrame existente o colector de resultados
+            (ver `ML/fx_results_collector.py`) donde agregar las métricas calculadas.
         model_name (str, opcional): Nombre del modelo (ej., 'KMeans-5', 'Agglomerative-10').
+        memory_budget_mb (float, opcional): Memoria máxima para matrices de distancias (ver `ClusterGeometry`).
+        silhouette_mode (str, opcional): 'exact' (por bloques, paralelo), 'sampled' (muestreo estratificado
+            por cluster, con error estándar) o 'simplified' (basada en centroides, O(n · k)).
+        silhouette_sample_size (int, opcional): Tamaño de la muestra en el modo 'sampled'.
+        random_state (int, opcional): Semilla del muestreo de la silueta.
+        n_jobs (int, opcional): Hilos para la silueta y el detector de anomalías (-1 = todos los núcleos).
+        detect_anomalies (bool, opcional): Si es False, omite la detección de anomalías ('Anomalies' queda en NaN).
+        cophenetic_sample_size (int, opcional): Por encima de este número de puntos, el coeficiente cophenético
+            se estima sobre una muestra de este tamaño (solo en 'g').
 
     Returns:
-        pd.DataFrame: DataFrame con las métricas calculadas para el modelo.
+        pd.DataFrame: DataFrame con las métricas calculadas para el modelo (o el propio colector si se pasó uno).
     """
     # Inicializar métricas con valores NaN
     metrics_dict = {
         'Model': [model_name],
         'Silhouette Coefficient': [np.nan],  #      Coeficiente de Silueta
+        'Silhouette Mode': [silhouette_mode], #     Modo de cálculo de la silueta
+        'Silhouette Std Error': [np.nan],    #      Error estándar de la silueta (0 si es exacta)
         'Davies-Bouldin Index': [np.nan],    #      Índice de Davies-Bouldin
         'Calinski-Harabasz Index': [np.nan], #      Índice de Calinski-Harabasz
         'Cophenetic Coefficient': [np.nan],  #      Coeficiente cophenético (jerárquico)
@@ -44,41 +452,64 @@ def evaluate_clustering(clustering_type, model, data, metrics=None, model_name=N
 
             clustering_results = model.labels_  # Etiquetas asignadas por el modelo
             centroids = model.cluster_centers_  # Coordenadas de los centroides
-            squared_distances = np.square(euclidean_distances(data, centroids))
+            geometry = ClusterGeometry(data, clustering_results, memory_budget_mb)  # Centroides y distancias compartidos
 
             # Métricas de calidad del clustering
-            metrics_dict['Silhouette Coefficient'] = [silhouette_score(data, clustering_results)]  #      Mide cohesión y separación
-            metrics_dict['Davies-Bouldin Index'] = [davies_bouldin_score(data, clustering_results)] #      Evalúa compacidad y separación
-            metrics_dict['Calinski-Harabasz Index'] = [calinski_harabasz_score(data, clustering_results)] #      Relación entre dispersión intra/intercluster
+            silhouette, silhouette_se = _silhouette(geometry, silhouette_mode, silhouette_sample_size, random_state, n_jobs)
+            metrics_dict['Silhouette Coefficient'] = [silhouette]        #      Mide cohesión y separación
+            metrics_dict['Silhouette Std Error'] = [silhouette_se]
+            metrics_dict['Davies-Bouldin Index'] = [geometry.davies_bouldin()]      #      Evalúa compacidad y separación
+            metrics_dict['Calinski-Harabasz Index'] = [geometry.calinski_harabasz()] #      Relación entre dispersión intra/intercluster
 
             # Métricas específicas de K-means
-            metrics_dict['WCSS'] = [np.sum(squared_distances[np.arange(len(data)), clustering_results])] #      Error cuadrático dentro del cluster
-            metrics_dict['BCSS'] = [np.sum(squared_distances) - metrics_dict['WCSS'][0]]                 #      Dispersión entre clusters
+            metrics_dict['WCSS'] = [float(geometry.within_cluster_ss(centroids, clustering_results, n_jobs).sum())] #      Error cuadrático dentro del cluster
+            metrics_dict['BCSS'] = [geometry.between_cluster_ss()]                                        #      Dispersión entre clusters
 
-            # Detección de anomalías (opcional)
-            outliers = IsolationForest().fit_predict(data)  #      Detección de outliers usando Isolation Forest
-            metrics_dict['Anomalies'] = [np.sum(outliers == -1)]  #      Cuenta el número de anomalías
+            # Detección de anomalías (opcional, una vez por conjunto de datos)
+            if detect_anomalies:
+                metrics_dict['Anomalies'] = [count_anomalies(geometry.X, 'isolation_forest', n_jobs, random_state)]  #      Cuenta el número de anomalías
 
         elif clustering_type == 'g':
             #      Clustering Jerárquico
             #      ---------------------
             #      Realiza clustering jerárquico y calcula métricas específicas.
 
-            linkage_matrix = linkage(data, method='complete', metric='euclidean')  # Matriz de linkage
-            metrics_dict['Cophenetic Coefficient'], _ = cophenet(linkage_matrix, pdist(data))  #      Correlación cophenética
+            geometry = ClusterGeometry(data, model.labels_, memory_budget_mb)
+            metrics_dict['Cophenetic Coefficient'] = [
+                _cophenetic(geometry, model, cophenetic_sample_size, random_state)
+            ]  #      Correlación cophenética (árbol del modelo si guarda `distances_`)
 
             # Métricas de calidad del clustering
-            metrics_dict['Silhouette Coefficient'] = [silhouette_score(data, model.labels_)]
-            metrics_dict['Davies-Bouldin Index'] = [davies_bouldin_score(data, model.labels_)]
-            metrics_dict['Calinski-Harabasz Index'] = [calinski_harabasz_score(data, model.labels_)]
+            silhouette, silhouette_se = _silhouette(geometry, silhouette_mode, silhouette_sample_size, random_state, n_jobs)
+            metrics_dict['Silhouette Coefficient'] = [silhouette]
+            metrics_dict['Silhouette Std Error'] = [silhouette_se]
+            metrics_dict['Davies-Bouldin Index'] = [geometry.davies_bouldin()]
+            metrics_dict['Calinski-Harabasz Index'] = [geometry.calinski_harabasz()]
 
-            # Detección de anomalías
-            outliers = LocalOutlierFactor().fit_predict(data)  #      Outliers usando Local Outlier Factor
-            metrics_dict['Anomalies'] = [np.sum(outliers == -1)]
+            # Detección de anomalías (opcional, una vez por conjunto de datos)
+            if detect_anomalies:
+                metrics_dict['Anomalies'] = [count_anomalies(geometry.X, 'lof', n_jobs)]
 
     except AttributeError as e:
         print(f"Error: {e}")
 
+    return append_metrics(metrics, metrics_dict)
+
+def append_metrics(metrics, metrics_dict):
+    """
+    Agrega la fila de métricas de un modelo a un DataFrame, a un colector de resultados o a una tabla nueva.
+
+    Args:
+        metrics (pd.DataFrame, ResultsCollector o None): Resultados acumulados.
+        metrics_dict (dict): Métricas del modelo, {columna: [valor]}.
+
+    Returns:
+        pd.DataFrame: DataFrame con la fila agregada (o el propio colector si se pasó uno).
+    """
+    # Con un colector de resultados se agrega la fila sin copiar la tabla acumulada
+    if hasattr(metrics, 'to_dataframe'):
+        return metrics.add({k: v[0] if isinstance(v, list) else v for k, v in metrics_dict.items()})
+
     # Crear un DataFrame con las métricas
     new_metrics = pd.DataFrame(metrics_dict)
 
@@ -98,9 +529,26 @@ def evaluate_clustering(clustering_type, model, data, metrics=None, model_name=N
 #
 # 2. Métricas y su interpretación:
 #    - Silhouette Coefficient: Varía entre -1 y 1. Valores cercanos a 1 indican clusters bien definidos.
+#      'Silhouette Mode' indica cómo se calculó ('exact', 'sampled' o 'simplified') y 'Silhouette Std Error'
+#      el error estándar de la estimación (0 si es exacta, NaN en el modo simplificado).
 #    - Davies-Bouldin Index: Valores bajos indican clusters compactos y bien separados.
 #    - Calinski-Harabasz Index: Valores altos indican buena separación intercluster y cohesión intracluster.
 #    - Cophenetic Coefficient: Evalúa cómo el dendrograma jerárquico preserva las distancias originales.
+#      Se usa el árbol del propio modelo si se ajustó con `compute_distances=True` (o `distance_threshold`);
+#      si no, un linkage completo. Con más de `cophenetic_sample_size` puntos se estima sobre una muestra.
 #    - WCSS (Within-Cluster Sum of Squares): Mide la compacidad de los clusters (más bajo es mejor).
-#    - BCSS (Between-Cluster Sum of Squares): Representa la separación entre clusters (más alto es mejor).
-#    - Anomalies: Número de puntos detectados como outliers o anomalías.
\ No newline at end of file
+#    - BCSS (Between-Cluster Sum of Squares): Σ n_k · ‖centroide_k − media global‖². Representa la separación
+#      entre clusters (más alto es mejor). Las versiones anteriores restaban WCSS de la suma de todas las
+#      distancias punto-centroide, que no es la dispersión entre clusters.
+#    - Anomalies: Número de puntos detectados como outliers o anomalías (Isolation Forest en 'k', LOF en 'g').
+#      El detector se ajusta una sola vez por conjunto de datos (caché LRU de ANOMALY_CACHE_SIZE entradas por
+#      huella del contenido) y se puede omitir con detect_anomalies=False. Fija `random_state` para que Isolation
+#      Forest sea reproducible; sin semilla entera se ajusta en cada llamada y no se cachea.
+#
+# 3. Rendimiento:
+#    - `ClusterGeometry` calcula centroides, distancias punto-centroide y (si cabe en `memory_budget_mb`)
+#      la matriz de distancias condensada una sola vez por llamada; todas las métricas la reutilizan.
+#    - Si la matriz condensada no cabe, la silueta se calcula por bloques de filas con memoria acotada.
+#    - WCSS se acumula por bloques de filas (distancia de cada punto solo a su centroide asignado), sin la
+#      matriz n × k de distancias a todos los centroides.
+#    - Para más de ~100k filas usa silhouette_mode='sampled' (coste O(muestra · n)) o 'simplified' (O(n · k)).
\ No newline at end of file
@@ -0,0 +1,165 @@
+# Importaciones necesarias
+import numpy as np
+from fx_evaluate_clustering import append_metrics
+
+# Estadísticos suficientes por partición
+# -------------------------------------
+def _partition_stats(rows, centers):
+    """
+    Estadísticos de una partición de filas (vector, cluster) respecto a los centroides del modelo.
+
+    Returns:
+        tuple: (conteos (k,), sumas (k, d), distancias al centroide (k,), distancias al cuadrado (k,)).
+    """
+    k, d = centers.shape
+    vectors, labels = [], []
+    for features, label in rows:
+        vectors.append(features.toArray() if hasattr(features, 'toArray') else features)
+        labels.append(label)
+    if not vectors:
+        return
+
+    X = np.asarray(vectors, dtype=np.float64).reshape(len(vectors), d)
+    assigned = np.asarray(labels, dtype=np.int64)
+    diff = X - centers[assigned]
+    squared = np.einsum('ij,ij->i', diff, diff)
+
+    sums = np.zeros((k, d))
+    np.add.at(sums, assigned, X)
+    yield (
+        np.bincount(assigned, minlength=k),
+        sums,
+        np.bincount(assigned, weights=np.sqrt(squared), minlength=k),
+        np.bincount(assigned, weights=squared, minlength=k),
+    )
+
+def _merge_stats(a, b):
+    return tuple(x + y for x, y in zip(a, b))
+
+def clustering_metrics_from_stats(stats, centers):
+    """
+    WCSS, BCSS, Davies-Bouldin y Calinski-Harabasz a partir de los estadísticos por cluster.
+
+    Args:
+        stats (tuple): (conteos, sumas, sumas de distancias al centroide, sumas de distancias al cuadrado).
+        centers (np.ndarray): Centroides del modelo, forma (k, d).
+
+    Returns:
+        dict: Valores de 'WCSS', 'BCSS', 'Davies-Bouldin Index' y 'Calinski-Harabasz Index'.
+    """
+    counts, sums, distance_sums, squared_sums = stats
+    present = counts > 0  # Los clusters vacíos no participan en los índices
+    counts, sums = counts[present], sums[present]
+    distance_sums, squared_sums, centers = distance_sums[present], squared_sums[present], centers[present]
+    n, k = counts.sum(), len(counts)
+
+    means = sums / counts[:, np.newaxis]
+    global_mean = sums.sum(axis=0) / n
+    wcss = float(squared_sums.sum())  # Respecto a los centroides del modelo
+    bcss = float(np.sum(counts * np.sum((means - global_mean) ** 2, axis=1)))
+
+    # Dispersión intra respecto a las medias: Σ‖x − c_k‖² = Σ‖x − μ_k‖² + n_k‖μ_k − c_k‖²
+    within = wcss - float(np.sum(counts * np.sum((means - centers) ** 2, axis=1)))
+    if k < 2:
+        return {'WCSS': wcss, 'BCSS': bcss, 'Davies-Bouldin Index': np.nan, 'Calinski-Harabasz Index': np.nan}
+    calinski_harabasz = 1.0 if within <= 0 else bcss * (n - k) / (within * (k - 1))
+
+    intra = distance_sums / counts
+    between = np.sqrt(np.maximum(
+        (centers ** 2).sum(axis=1)[:, np.newaxis] - 2 * centers @ centers.T + (centers ** 2).sum(axis=1), 0
+    ))
+    if np.allclose(intra, 0) or np.allclose(between, 0):
+        davies_bouldin = 0.0
+    else:
+        np.fill_diagonal(between, np.inf)  # La fórmula expandida deja residuos de redondeo en la diagonal
+        between[between == 0] = np.inf
+        davies_bouldin = float(np.mean(np.max((intra[:, np.newaxis] + intra) / between, axis=1)))
+
+    return {
+        'WCSS': wcss,
+        'BCSS': bcss,
+        'Davies-Bouldin Index': davies_bouldin,
+        'Calinski-Harabasz Index': float(calinski_harabasz),
+    }
+
+# Función principal
+def evaluate_clustering_spark(model, sdf, metrics=None, model_name=None, features_col='features',
+                              prediction_col='prediction', centers=None):
+    """
+    Evalúa un K-means de Spark con una sola pasada distribuida sobre los datos.
+
+    Cada partición calcula conteos, sumas y sumas de distancias (simples y al cuadrado) al centroide
+    asignado; los estadísticos se combinan con `treeAggregate` y en el driver solo se trabaja con
+    matrices k × d. Los datos nunca se recogen en el driver.
+
+    Args:
+        model: Modelo de `pyspark.ml.clustering` (KMeansModel, BisectingKMeansModel) o None si se pasan `centers`.
+        sdf (pyspark.sql.DataFrame): Datos con la columna de vectores `features_col`. Si no tiene
+            `prediction_col`, se obtiene con `model.transform`.
+        metrics (pd.DataFrame o ResultsCollector, opcional): Resultados donde agregar las métricas
+            (las mismas columnas que `evaluate_clustering`).
+        model_name (str, opcional): Nombre del modelo (ej., 'KMeans-5').
+        features_col (str, opcional): Columna de vectores de características.
+        prediction_col (str, opcional): Columna con el cluster asignado (0..k-1).
+        centers (array-like, opcional): Centroides (k, d) si no se pasa un modelo.
+
+    Returns:
+        pd.DataFrame: DataFrame con las métricas calculadas para el modelo (o el propio colector si se pasó uno).
+            Si `sdf` no tiene filas, las métricas quedan en NaN.
+    """
+    if centers is None:
+        centers = model.clusterCenters()
+    centers = np.asarray([np.asarray(c, dtype=np.float64) for c in centers])
+    if prediction_col not in sdf.columns:
+        sdf = model.transform(sdf)
+
+    # Inicializar métricas con valores NaN (resultado de unos datos vacíos, como en `evaluate_clustering`)
+    metrics_dict = {
+        'Model': [model_name],
+        'Silhouette Coefficient': [np.nan],  #      No se calcula en esta pasada (ver `kmeans_k_sweep`)
+        'Silhouette Mode': [None],
+        'Silhouette Std Error': [np.nan],
+        'Davies-Bouldin Index': [np.nan],
+        'Calinski-Harabasz Index': [np.nan],
+        'Cophenetic Coefficient': [np.nan],
+        'WCSS': [np.nan],
+        'BCSS': [np.nan],
+        'Anomalies': [np.nan],
+    }
+
+    rdd = sdf.select(features_col, prediction_col).rdd
+    centers_b = rdd.context.broadcast(centers)
+    zero = (np.zeros(len(centers), dtype=np.int64), np.zeros(centers.shape), np.zeros(len(centers)), np.zeros(len(centers)))
+    try:
+        # `treeAggregate` con estadísticos nulos como valor inicial admite un RDD vacío (`treeReduce` fallaría)
+        stats = rdd.mapPartitions(lambda rows: _partition_stats(rows, centers_b.value)).treeAggregate(
+            zero, _merge_stats, _merge_stats
+        )
+    finally:
+        centers_b.unpersist()
+
+    if stats[0].sum() == 0:
+        print("Error: no hay filas que evaluar")
+        return append_metrics(metrics, metrics_dict)
+
+    values = clustering_metrics_from_stats(stats, centers)
+    for name in ('Davies-Bouldin Index', 'Calinski-Harabasz Index', 'WCSS', 'BCSS'):
+        metrics_dict[name] = [values[name]]
+    return append_metrics(metrics, metrics_dict)
+
+# Notas sobre el uso:
+# -------------------
+# 1. Ejemplo:
+#    model = KMeans(k=5, featuresCol='features').fit(sdf)
+#    resultados = evaluate_clustering_spark(model, sdf, model_name='KMeans-5')
+#
+# 2. Definiciones:
+#    - WCSS: Σ ‖x − c_k‖² respecto a los centroides del modelo (igual que `model.summary.trainingCost`).
+#    - BCSS: Σ n_k · ‖μ_k − μ‖² con las medias reales de cada cluster.
+#    - Calinski-Harabasz usa la dispersión intra respecto a las medias, obtenida de WCSS sin otra pasada.
+#    - Davies-Bouldin usa los centroides del modelo; coincide con sklearn cuando K-means ha convergido
+#      (centroides = medias de cada cluster).
+#
+# 3. Rendimiento:
+#    - Una sola pasada por los datos; cada partición devuelve O(k · d) valores y solo viajan al driver
+#      esos estadísticos, sin la matriz n × k de distancias ni `toPandas()`.
\ No newline at end of file
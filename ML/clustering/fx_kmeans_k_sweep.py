@@ -0,0 +1,231 @@
+# Importaciones necesarias
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+from pyspark import StorageLevel
+from pyspark.ml.feature import VectorAssembler
+from pyspark.mllib.clustering import KMeans as MLlibKMeans, KMeansModel
+from pyspark.mllib.linalg import Vectors as MLlibVectors
+
+# Funciones auxiliares por partición
+# ----------------------------------
+def _to_block(rows):
+    """
+    Convierte los vectores de una partición en una matriz NumPy (n_filas, d).
+    """
+    return np.array([v.toArray() for v in rows], dtype=np.float64)
+
+def _assign(X, centers):
+    """
+    Asigna cada fila al centroide más cercano y devuelve (asignación, distancias al cuadrado n×k).
+    """
+    squared = (X * X).sum(axis=1)[:, np.newaxis] - 2 * X @ centers.T + (centers * centers).sum(axis=1)
+    np.maximum(squared, 0, out=squared)
+    return squared.argmin(axis=1), squared
+
+def _cluster_stats(vectors, centers):
+    """
+    Estadísticos suficientes por cluster en una sola pasada distribuida.
+
+    Returns:
+        tuple: (conteos (k,), sumas (k, d), sumas de normas al cuadrado (k,), inercia).
+    """
+    k, d = centers.shape
+    centers_b = vectors.context.broadcast(centers)
+
+    def partition(rows):
+        X = _to_block(rows)
+        if X.size == 0:
+            return
+        assigned, squared = _assign(X, centers_b.value)
+        sums = np.zeros((k, d))
+        np.add.at(sums, assigned, X)
+        yield (
+            np.bincount(assigned, minlength=k),
+            sums,
+            np.bincount(assigned, weights=(X * X).sum(axis=1), minlength=k),
+            float(squared[np.arange(len(X)), assigned].sum()),
+        )
+
+    try:
+        return vectors.mapPartitions(partition).treeReduce(
+            lambda a, b: (a[0] + b[0], a[1] + b[1], a[2] + b[2], a[3] + b[3])
+        )
+    finally:
+        centers_b.unpersist()
+
+def _silhouette(vectors, centers, stats):
+    """
+    Coeficiente de silueta con distancia euclídea al cuadrado, igual que `ClusteringEvaluator`
+    (metricName='silhouette', distanceMeasure='squaredEuclidean'), a partir de los estadísticos
+    por cluster: coste O(n · k) en una sola pasada, sin distancias entre pares de puntos.
+    """
+    counts, sums, squared_norms, _ = stats
+    stats_b = vectors.context.broadcast((centers, counts, sums, squared_norms))
+
+    def partition(rows):
+        X = _to_block(rows)
+        if X.size == 0:
+            return
+        centers_, counts_, sums_, squared_norms_ = stats_b.value
+        assigned, _ = _assign(X, centers_)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Distancia cuadrática media de cada punto a cada cluster
+            average = (X * X).sum(axis=1)[:, np.newaxis] + squared_norms_ / counts_ - 2 * X @ (sums_ / counts_[:, np.newaxis]).T
+        average[:, counts_ == 0] = np.inf
+
+        rows_ = np.arange(len(X))
+        own = counts_[assigned]
+        # Los clusters de un solo punto no tienen distancia intra-cluster: su silueta es 0 por convenio
+        current = np.divide(average[rows_, assigned] * own, own - 1, out=np.zeros(len(X)), where=own > 1)
+        average[rows_, assigned] = np.inf
+        neighbour = average.min(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scores = np.where(current < neighbour, 1 - current / neighbour,
+                              np.where(current > neighbour, neighbour / current - 1, 0.0))
+        scores[own == 1] = 0.0
+        yield float(np.nan_to_num(scores).sum()), len(X)
+
+    try:
+        total, n = vectors.mapPartitions(partition).treeReduce(lambda a, b: (a[0] + b[0], a[1] + b[1]))
+        return total / n
+    finally:
+        stats_b.unpersist()
+
+def _split_largest_cluster(centers, stats, rng):
+    """
+    Centroides iniciales para k+1 a partir de los de k: divide el cluster con mayor SSE en dos.
+    """
+    counts, sums, squared_norms, _ = stats
+    sse = squared_norms - 2 * (centers * sums).sum(axis=1) + counts * (centers * centers).sum(axis=1)
+    largest = int(np.argmax(sse))
+    spread = np.sqrt(max(sse[largest], 0) / max(counts[largest], 1) / centers.shape[1])
+    direction = rng.standard_normal(centers.shape[1])
+    direction *= spread / np.linalg.norm(direction)
+
+    new_centers = np.vstack([centers, centers[largest] - direction])
+    new_centers[largest] = centers[largest] + direction
+    return new_centers
+
+def _elbow(k_values, inertia):
+    """
+    Codo de la curva de inercia: punto más alejado de la recta entre los extremos (curvas normalizadas).
+    """
+    x = (np.asarray(k_values, dtype=float) - k_values[0]) / max(k_values[-1] - k_values[0], 1)
+    y = np.asarray(inertia, dtype=float)
+    y = (y[0] - y) / max(y[0] - y[-1], 1e-12)
+    return int(k_values[int(np.argmax(y - x))])
+
+# Función principal
+def kmeans_k_sweep(df, k_values=range(2, 20), features_col="features", feature_columns=None,
+                   max_iter=20, seed=1, max_workers=4):
+    """
+    Barrido rápido de k para K-means en Spark: curvas de inercia y silueta y k recomendado.
+
+    Sustituye el bucle del notebook `nclusters_elbow+shilhouette.ipynb`:
+      - Los vectores de características se ensamblan (si hace falta) y se cachean una sola vez.
+      - Cada k arranca desde los centroides del k anterior, dividiendo el cluster con mayor SSE,
+        por lo que converge en pocas iteraciones.
+      - La inercia sale de la misma pasada que calcula los estadísticos por cluster, y la silueta
+        (misma definición que `ClusteringEvaluator` con 'squaredEuclidean') se calcula en paralelo
+        mientras se ajusta el siguiente k.
+
+    Args:
+        df (pyspark.sql.DataFrame): Datos con la columna de vectores `features_col`, o columnas numéricas.
+        k_values (iterable, opcional): Valores de k a evaluar, en orden creciente.
+        features_col (str, opcional): Columna de vectores de características.
+        feature_columns (list, opcional): Columnas numéricas a ensamblar con `VectorAssembler`
+            si `df` todavía no tiene `features_col`.
+        max_iter (int, opcional): Iteraciones máximas de K-means por cada k.
+        seed (int, opcional): Semilla de la inicialización.
+        max_workers (int, opcional): Evaluaciones de silueta simultáneas (trabajos Spark concurrentes).
+
+    Returns:
+        tuple: (pd.DataFrame con columnas 'k', 'inertia', 'silhouette'; k recomendado por silueta;
+        k del codo de la inercia).
+    """
+    k_values = sorted(k_values)
+    if feature_columns is not None:
+        df = VectorAssembler(inputCols=feature_columns, outputCol=features_col).transform(df)
+
+    # Vectores cacheados una sola vez para todos los valores de k
+    vectors = (
+        df.select(features_col).rdd
+        .map(lambda row: MLlibVectors.fromML(row[0]))
+        .persist(StorageLevel.MEMORY_AND_DISK)
+    )
+    rng = np.random.default_rng(seed)
+    inertia, silhouette_futures = {}, {}
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            centers, stats = None, None
+            for k in k_values:
+                if centers is None or len(centers) != k - 1:
+                    model = MLlibKMeans.train(vectors, k, maxIterations=max_iter, seed=seed)
+                else:
+                    initial = KMeansModel(list(_split_largest_cluster(centers, stats, rng)))
+                    model = MLlibKMeans.train(vectors, k, maxIterations=max_iter, seed=seed, initialModel=initial)
+
+                centers = np.array([np.asarray(c, dtype=np.float64) for c in model.clusterCenters])
+                stats = _cluster_stats(vectors, centers)
+                inertia[k] = stats[3]
+                silhouette_futures[k] = executor.submit(_silhouette, vectors, centers, stats)
+
+            silhouette = {k: future.result() for k, future in silhouette_futures.items()}
+    finally:
+        vectors.unpersist()
+
+    results = pd.DataFrame({
+        'k': k_values,
+        'inertia': [inertia[k] for k in k_values],
+        'silhouette': [silhouette[k] for k in k_values],
+    })
+    recommended_k = int(results.loc[results['silhouette'].idxmax(), 'k'])
+    elbow_k = _elbow(k_values, results['inertia'].values) if len(k_values) > 2 else recommended_k
+    return results, recommended_k, elbow_k
+
+def plot_k_sweep(results, recommended_k=None):
+    """
+    Dibuja las curvas de inercia (criterio del codo) y de silueta de `kmeans_k_sweep`.
+
+    Args:
+        results (pd.DataFrame): Resultado de `kmeans_k_sweep`.
+        recommended_k (int, opcional): k a resaltar en ambas gráficas.
+    """
+    plt.figure(figsize=(14, 7))
+    plt.subplot(1, 2, 1)
+    plt.plot(results['k'], results['inertia'], marker='o', linestyle='-', color='blue')
+    plt.xlabel('Número de Clusters (k)')
+    plt.ylabel('Inercia')
+    plt.title('Criterio del Codo')
+    if recommended_k is not None:
+        plt.axvline(recommended_k, color='grey', linestyle='--')
+
+    plt.subplot(1, 2, 2)
+    plt.plot(results['k'], results['silhouette'], marker='o', linestyle='-', color='red')
+    plt.xlabel('Número de Clusters (k)')
+    plt.ylabel('Coeficiente de Silhouette')
+    plt.title('Coeficiente de Silhouette para diferentes valores de k')
+    if recommended_k is not None:
+        plt.axvline(recommended_k, color='grey', linestyle='--')
+
+    plt.tight_layout()
+    plt.show()
+
+# Notas sobre el uso:
+# -------------------
+# 1. Ejemplo:
+#    results, best_k, elbow_k = kmeans_k_sweep(df, k_values=range(2, 20), feature_columns=df.columns)
+#    plot_k_sweep(results, best_k)
+#
+# 2. Diferencias con el bucle original:
+#    - Los modelos se ajustan con `pyspark.mllib` porque `pyspark.ml.clustering.KMeans` no admite centroides
+#      iniciales; el arranque en caliente reduce las iteraciones de cada k.
+#    - La silueta coincide con `ClusteringEvaluator(distanceMeasure='squaredEuclidean')` y la inercia con
+#      `model.summary.trainingCost`, pero ambas se obtienen sin `model.transform` ni evaluadores adicionales.
+#
+# 3. Recomendación de k:
+#    - `best_k` es el k con mayor silueta; `elbow_k` es el codo de la curva de inercia. Si no coinciden,
+#      revisa ambas curvas antes de decidir.
\ No newline at end of file
@@ -1,52 +1,183 @@
 # Importaciones necesarias
 import numpy as np
-import pandas as pd
-from sklearn.decomposition import PCA
+from sklearn.decomposition import PCA, IncrementalPCA
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 from mpl_toolkits.mplot3d import Axes3D
 
+def stratified_sample_indices(labels, max_points, random_state=None):
+    """
+    Selecciona unos `max_points` índices con muestreo estratificado por cluster.
+
+    Cada cluster conserva una parte proporcional a su tamaño, con un mínimo que mantiene
+    visibles los clusters pequeños (por eso el total puede superar ligeramente `max_points`).
+
+    Args:
+        labels (array-like): Etiquetas de cluster de cada punto.
+        max_points (int): Número aproximado de puntos a conservar.
+        random_state (int, opcional): Semilla del muestreo.
+
+    Returns:
+        np.ndarray: Índices ordenados de los puntos seleccionados.
+    """
+    labels = np.asarray(labels)
+    if len(labels) <= max_points:
+        return np.arange(len(labels))
+
+    rng = np.random.default_rng(random_state)
+    clusters, codes, counts = np.unique(labels, return_inverse=True, return_counts=True)
+    minimum = max(1, max_points // (10 * len(clusters)))
+    allocation = np.minimum(counts, np.maximum(minimum, (counts * max_points // len(labels))))
+
+    order = np.argsort(codes, kind='stable')
+    starts = np.concatenate([[0], np.cumsum(counts)])
+    selected = [
+        rng.choice(order[starts[c]:starts[c + 1]], size=allocation[c], replace=False)
+        for c in range(len(clusters))
+    ]
+    return np.sort(np.concatenate(selected))
+
+def _iter_batches(source, batch_size):
+    """
+    Recorre `source` por lotes float64: un array (p. ej. np.memmap) se lee por rebanadas y un
+    callable se invoca para obtener un iterador nuevo de bloques en cada pasada.
+    """
+    if callable(source):
+        for chunk in source():
+            yield np.asarray(chunk, dtype=np.float64)
+    else:
+        for start in range(0, source.shape[0], batch_size):
+            yield np.asarray(source[start:start + batch_size], dtype=np.float64)
+
+def incremental_pca_projection(data, cluster_centers, n_components=3, batch_size=10000, n_samples=None):
+    """
+    Proyecta por PCA datos que no caben en memoria, con memoria pico acotada por el tamaño de lote.
+
+    Se hacen dos pasadas sobre los datos: `IncrementalPCA.partial_fit` lote a lote y, después,
+    la proyección de cada lote directamente en un array de salida preasignado (n, n_components).
+
+    Args:
+        data (np.ndarray, np.memmap, str o callable): Matriz (n, d), ruta a un `.npy` (se abre con
+            `mmap_mode='r'`) o función sin argumentos que devuelve un iterador de bloques (n_i, d).
+        cluster_centers (array-like): Coordenadas de los centros de los clusters.
+        n_components (int, opcional): Número de componentes.
+        batch_size (int, opcional): Filas por lote cuando `data` es un array.
+        n_samples (int, opcional): Número total de filas cuando `data` es un callable (si no se indica,
+            las proyecciones de cada bloque se concatenan al final).
+
+    Returns:
+        tuple: (proyección de los datos (n, n_components), proyección de los centroides).
+    """
+    if isinstance(data, str):
+        data = np.load(data, mmap_mode='r')
+    if not callable(data):
+        n_samples = data.shape[0]
+
+    # Primera pasada: ajuste incremental. Cada lote se ajusta al llegar el siguiente, de modo que los
+    # lotes con menos filas que n_components (p. ej. el último) se unen al lote anterior en lugar de perderse
+    ipca = IncrementalPCA(n_components=n_components)
+    held = None
+    for batch in _iter_batches(data, batch_size):
+        if held is None:
+            held = batch
+        elif held.shape[0] < n_components or batch.shape[0] < n_components:
+            held = np.vstack([held, batch])
+        else:
+            ipca.partial_fit(held)
+            held = batch
+    if held is None or held.shape[0] < n_components:
+        raise ValueError(f"Se necesitan al menos {n_components} filas para ajustar la PCA")
+    ipca.partial_fit(held)
+    del held
+
+    # Segunda pasada: proyección lote a lote en la salida preasignada
+    if n_samples is not None:
+        projection = np.empty((n_samples, n_components))
+        position = 0
+        for batch in _iter_batches(data, batch_size):
+            if position + batch.shape[0] > n_samples:
+                raise ValueError(
+                    f"La fuente de datos devolvió más filas de las indicadas en n_samples ({n_samples})"
+                )
+            projection[position:position + batch.shape[0]] = ipca.transform(batch)
+            position += batch.shape[0]
+        projection = projection[:position]
+    else:
+        projection = np.concatenate([ipca.transform(batch) for batch in _iter_batches(data, batch_size)])
+
+    return projection, ipca.transform(cluster_centers)
+
 # Función principal
-def plot_cluster_pca(data, labels, cluster_centers, title=None, xlabel=None, ylabel=None):
+def plot_cluster_pca(data, labels, cluster_centers, title=None, xlabel=None, ylabel=None,
+                     max_points=None, random_state=None, save_path=None, incremental=False, batch_size=10000):
     """
     Visualiza los clusters en un espacio reducido mediante PCA, en 2D y 3D.
 
     Args:
-        data (array-like): Datos originales (dimensionalidad completa).
+        data (array-like): Datos originales (dimensionalidad completa). Con `incremental=True` también
+            admite un np.memmap, la ruta a un `.npy` o una función que devuelva un iterador de bloques.
         labels (array-like): Etiquetas de cluster para cada punto de datos.
         cluster_centers (array-like): Coordenadas de los centros de los clusters.
         title (str, opcional): Título para el gráfico.
         xlabel (str, opcional): Etiqueta para el eje X en el gráfico 2D.
         ylabel (str, opcional): Etiqueta para el eje Y en el gráfico 2D.
+        max_points (int, opcional): Máximo de puntos a dibujar; si hay más, se hace un muestreo
+            estratificado por cluster (la PCA se ajusta igualmente con todos los datos).
+        random_state (int, opcional): Semilla de la PCA aleatorizada y del muestreo.
+        save_path (str, opcional): Si se indica, el gráfico se renderiza sin interfaz gráfica
+            directamente a este archivo (png, pdf, svg...) en lugar de mostrarse.
+        incremental (bool, opcional): Si es True, usa `IncrementalPCA` por lotes (`incremental_pca_projection`)
+            para datos más grandes que la memoria.
+        batch_size (int, opcional): Filas por lote en el modo incremental.
 
     Returns:
-        None. La función genera gráficos 2D y 3D directamente.
+        None. La función genera gráficos 2D y 3D directamente (o los guarda en `save_path`).
     """
+    labels = np.asarray(labels)
+
     # Reducción de dimensionalidad con PCA
     # ------------------------------------
-    # PCA a 2 componentes para visualización 2D
-    pca_2d = PCA(n_components=2)
-    data_pca_2d = pca_2d.fit_transform(data)
-    
-    # PCA a 3 componentes para visualización 3D
-    pca_3d = PCA(n_components=3)
-    data_pca_3d = pca_3d.fit_transform(data)
-    
-    # Proyectar los centroides en el espacio PCA
-    pca_centers_2d = pca_2d.transform(cluster_centers)
-    pca_centers_3d = pca_3d.transform(cluster_centers)
-
-    # Convertir los datos a DataFrame para manipulación más sencilla
-    df_2d = pd.DataFrame(data_pca_2d, columns=['PC1', 'PC2'])
-    df_2d['Cluster'] = labels.astype(str)
-    
-    df_3d = pd.DataFrame(data_pca_3d, columns=['PC1', 'PC2', 'PC3'])
-    df_3d['Cluster'] = labels.astype(str)
-    
+    # Un único ajuste a 3 componentes: la vista 2D usa las dos primeras (PC1 y PC2)
+    if incremental:
+        # Fuera de memoria: ajuste y proyección por lotes, luego muestreo sobre la proyección (n × 3)
+        data_pca_3d, pca_centers_3d = incremental_pca_projection(
+            data, cluster_centers, batch_size=batch_size, n_samples=len(labels)
+        )
+        if max_points is not None:
+            indices = stratified_sample_indices(labels, max_points, random_state)
+            data_pca_3d, labels = data_pca_3d[indices], labels[indices]
+        return _draw_projection(data_pca_3d, labels, pca_centers_3d, title, xlabel, ylabel, save_path)
+
+    pca = PCA(n_components=3, svd_solver='randomized', random_state=random_state)
+    pca.fit(data)
+
+    # Proyectar solo los puntos que se van a dibujar y los centroides
+    if max_points is not None:
+        indices = stratified_sample_indices(labels, max_points, random_state)
+        data_pca_3d = pca.transform(np.asarray(data)[indices])
+        labels = labels[indices]
+    else:
+        data_pca_3d = pca.transform(data)
+    pca_centers_3d = pca.transform(cluster_centers)
+
+    _draw_projection(data_pca_3d, labels, pca_centers_3d, title, xlabel, ylabel, save_path)
+
+def _draw_projection(data_pca_3d, labels, pca_centers_3d, title, xlabel, ylabel, save_path):
+    """
+    Dibuja las vistas 2D (PC1-PC2) y 3D de una proyección PCA ya calculada.
+    """
+    # Figura sin interfaz gráfica si se guarda a archivo
+    if save_path:
+        fig = Figure(figsize=(12, 6))
+        FigureCanvasAgg(fig)
+    else:
+        fig = plt.figure(figsize=(12, 6))  # Tamaño de la figura para 2D y 3D
+
     # Gráfico 2D
-    plt.figure(figsize=(12, 6))  # Tamaño de la figura para 2D y 3D
-    ax1 = plt.subplot(121)  # Subgráfico para 2D a la izquierda
-    scatter = ax1.scatter(data_pca_2d[:, 0], data_pca_2d[:, 1], c=labels, cmap='viridis', s=10, alpha=0.5)
-    ax1.scatter(pca_centers_2d[:, 0], pca_centers_2d[:, 1], marker='*', c='red', s=200, label='Centroids')
+    ax1 = fig.add_subplot(121)  # Subgráfico para 2D a la izquierda
+    scatter = ax1.scatter(data_pca_3d[:, 0], data_pca_3d[:, 1], c=labels, cmap='viridis', s=10, alpha=0.5)
+    ax1.scatter(pca_centers_3d[:, 0], pca_centers_3d[:, 1], marker='*', c='red', s=200, label='Centroids')
     if title:
         ax1.set_title(title + ' - 2D')
     if xlabel:
@@ -57,7 +188,7 @@ def plot_cluster_pca(data, labels, cluster_centers, title=None, xlabel=None, yla
     ax1.add_artist(legend1)
 
     # Gráfico 3D
-    ax2 = plt.subplot(122, projection='3d')
+    ax2 = fig.add_subplot(122, projection='3d')
     ax2.scatter(data_pca_3d[:, 0], data_pca_3d[:, 1], data_pca_3d[:, 2], c=labels, cmap='viridis', s=10, alpha=0.5)
     ax2.scatter(pca_centers_3d[:, 0], pca_centers_3d[:, 1], pca_centers_3d[:, 2], marker='*', c='red', s=200, label='Centroids')
     if title:
@@ -67,8 +198,11 @@ def plot_cluster_pca(data, labels, cluster_centers, title=None, xlabel=None, yla
     ax2.set_zlabel('PC3')
     ax2.legend()
 
-    plt.tight_layout()  # Ajustar los elementos del gráfico para que no se superpongan
-    plt.show()
+    fig.tight_layout()  # Ajustar los elementos del gráfico para que no se superpongan
+    if save_path:
+        fig.savefig(save_path, dpi=150)
+    else:
+        plt.show()
 
 # Notas sobre el uso:
 # -------------------
@@ -82,7 +216,9 @@ def plot_cluster_pca(data, labels, cluster_centers, title=None, xlabel=None, yla
 # 2. ¿Qué es PCA?
 #    - PCA (Análisis de Componentes Principales) reduce la dimensionalidad de los datos,
 #      proyectándolos en un nuevo espacio donde las primeras componentes capturan la mayor varianza.
-#    - En este caso, se usa PCA para reducir los datos a 2 y 3 dimensiones para visualización.
+#    - En este caso, se ajusta una sola PCA a 3 dimensiones; la vista 2D usa sus dos primeras componentes,
+#      que coinciden aproximadamente con las de una PCA exacta a 2 componentes (salvo el signo y la
+#      tolerancia del solver aleatorizado).
 #
 # 3. Explicación de los gráficos:
 #    - Gráfico 2D:
@@ -95,3 +231,10 @@ def plot_cluster_pca(data, labels, cluster_centers, title=None, xlabel=None, yla
 # 4. Recomendaciones:
 #    - Úsalo cuando quieras visualizar clusters en datasets con más de 3 dimensiones.
 #    - Requiere que el modelo de clustering proporcione etiquetas (`labels`) y centroides (`cluster_centers`).
+#
+# 5. Conjuntos grandes:
+#    - Con millones de puntos el cuello de botella es el scatter 3D de matplotlib: usa `max_points`
+#      (p. ej. 50_000) para dibujar una muestra estratificada por cluster.
+#    - En servidores o trabajos batch usa `save_path` para renderizar directamente a archivo sin pantalla.
+#    - Si la matriz no cabe en memoria (p. ej. un `.npy` mayor que la RAM), usa `incremental=True` con la ruta
+#      del archivo o un np.memmap: la memoria pico queda acotada por `batch_size` filas.
\ No newline at end of file
@@ -0,0 +1,82 @@
+# Importaciones necesarias
+import pandas as pd
+
+# Colector de resultados compartido por las funciones de métricas
+class ResultsCollector:
+    """
+    Acumula filas de métricas sin copiar la tabla completa en cada experimento.
+
+    `pd.concat([df, nueva_fila])` copia todo el DataFrame acumulado en cada llamada, lo que
+    hace que un barrido de n experimentos cueste O(n²). El colector guarda los valores por
+    columna en listas de Python (O(1) amortizado por fila) y solo construye el DataFrame
+    cuando se pide con `to_dataframe()`.
+
+    Lo aceptan `obtener_metricas` (parámetro `df`) y `evaluate_clustering` (parámetro `metrics`),
+    que agregan la fila y devuelven el propio colector.
+
+    Args:
+        df (pd.DataFrame, opcional): Resultados previos con los que inicializar el colector.
+    """
+
+    def __init__(self, df=None):
+        self._columnas = {}
+        self._n_filas = 0
+        self._cache = None
+        if df is not None:
+            for columna in df.columns:
+                self._columnas[columna] = df[columna].tolist()
+            self._n_filas = len(df)
+
+    def add(self, fila):
+        """
+        Agrega una fila de métricas.
+
+        Args:
+            fila (dict): Diccionario {columna: valor}. Las columnas nuevas se rellenan con None
+                en las filas anteriores y las ausentes con None en esta fila.
+
+        Returns:
+            ResultsCollector: El propio colector.
+        """
+        for columna in fila:
+            if columna not in self._columnas:
+                self._columnas[columna] = [None] * self._n_filas
+        for columna, valores in self._columnas.items():
+            valores.append(fila.get(columna))
+        self._n_filas += 1
+        self._cache = None
+        return self
+
+    def extend(self, filas):
+        """
+        Agrega varias filas de métricas.
+        """
+        for fila in filas:
+            self.add(fila)
+        return self
+
+    def __len__(self):
+        return self._n_filas
+
+    def to_dataframe(self):
+        """
+        Construye (una sola vez hasta la siguiente fila nueva) el DataFrame con todas las filas.
+
+        Returns:
+            pd.DataFrame: Una fila por experimento, columnas en orden de aparición.
+        """
+        if self._cache is None:
+            self._cache = pd.DataFrame(self._columnas, columns=list(self._columnas))
+        return self._cache
+
+# Notas sobre el uso:
+# -------------------
+# 1. Ejemplo:
+#    resultados = ResultsCollector()
+#    for modelo in modelos:
+#        obtener_metricas(..., df=resultados)
+#    tabla = resultados.to_dataframe()
+#
+# 2. Compatibilidad:
+#    - Pasar un DataFrame (o None) en `df`/`metrics` sigue funcionando como antes y devuelve un DataFrame.
+#    - Pasar un `ResultsCollector` evita la copia cuadrática y devuelve el colector.
\ No newline at end of file
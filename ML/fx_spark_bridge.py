@@ -0,0 +1,196 @@
+# Importaciones necesarias
+import numpy as np
+import pyarrow as pa
+
+# Puente Spark -> pandas/NumPy con Arrow para las funciones de métricas
+# ---------------------------------------------------------------------
+# Las funciones de ML de este repositorio (`metriques`, `obtener_metricas`, `evaluate_clustering`,
+# `describe_clusters`) trabajan con pandas/NumPy. Este módulo trae desde Spark solo las columnas
+# necesarias como lotes Arrow, partición a partición, y los vuelca en arrays NumPy contiguos.
+
+def enable_arrow(spark, max_records_per_batch=100000):
+    """
+    Activa la transferencia con Arrow entre Spark y pandas en la sesión.
+
+    Args:
+        spark (SparkSession): Sesión de Spark.
+        max_records_per_batch (int, opcional): Filas por lote Arrow.
+    """
+    spark.conf.set("spark.sql.execution.arrow.pyspark.enabled", "true")
+    spark.conf.set("spark.sql.execution.arrow.pyspark.fallback.enabled", "true")
+    spark.conf.set("spark.sql.execution.arrow.maxRecordsPerBatch", str(max_records_per_batch))
+
+def _session(sdf):
+    return sdf.sparkSession if hasattr(sdf, 'sparkSession') else sdf.sql_ctx.sparkSession
+
+def _serialize_batches(iterator):
+    """
+    Se ejecuta en los executors (`mapInArrow`): empaqueta cada lote Arrow en formato IPC binario.
+    """
+    import pyarrow as pa
+    for batch in iterator:
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, batch.schema) as writer:
+            writer.write_batch(batch)
+        yield pa.RecordBatch.from_arrays([pa.array([sink.getvalue().to_pybytes()], type=pa.binary())], names=['arrow'])
+
+def _rows_to_batch(rows, names, types):
+    """
+    Convierte una lista de filas de Spark en un lote Arrow; `types` fija el tipo de cada columna
+    con el del primer lote en que no es enteramente nula.
+    """
+    arrays = []
+    for i, values in enumerate(zip(*rows)):
+        array = pa.array(values, type=types[i])
+        if types[i] is None and array.type != pa.null():
+            types[i] = array.type
+        arrays.append(array)
+    return pa.RecordBatch.from_arrays(arrays, names=names)
+
+def iter_arrow_batches(sdf, columns=None, batch_rows=100000):
+    """
+    Itera sobre los lotes Arrow de `sdf` trayendo al driver una partición cada vez.
+
+    Con Spark >= 3.3 los lotes se serializan en los executors (`mapInArrow`) y se reciben con
+    `toLocalIterator`, de modo que la memoria del driver queda acotada por una partición.
+    En versiones anteriores las filas se reciben con `toLocalIterator` y se agrupan en el driver
+    en lotes de `batch_rows` filas: más lento (las filas pasan por objetos Python), pero la
+    memoria sigue acotada por una partición y nunca se recogen los datos completos.
+
+    Args:
+        sdf (pyspark.sql.DataFrame): Datos de Spark.
+        columns (list, opcional): Columnas a traer (por defecto, todas).
+        batch_rows (int, opcional): Filas por lote en la lectura sin `mapInArrow`.
+
+    Yields:
+        pyarrow.RecordBatch: Lotes con las columnas pedidas.
+    """
+    enable_arrow(_session(sdf))
+    if columns is not None:
+        sdf = sdf.select(*columns)
+
+    if hasattr(sdf, 'mapInArrow'):
+        blobs = sdf.mapInArrow(_serialize_batches, "arrow binary")
+        for row in blobs.toLocalIterator(prefetchPartitions=True):
+            yield from pa.ipc.open_stream(pa.py_buffer(row['arrow']))
+    else:
+        names = sdf.columns
+        types = [None] * len(names)  # Tipo inferido del primer lote con valores, para que todos los lotes coincidan
+        chunk = []
+        for row in sdf.toLocalIterator():
+            chunk.append(row)
+            if len(chunk) == batch_rows:
+                yield _rows_to_batch(chunk, names, types)
+                chunk = []
+        if chunk:
+            yield _rows_to_batch(chunk, names, types)
+
+def iter_numpy_chunks(sdf, columns, chunk_rows=1000000, dtype=np.float64):
+    """
+    Devuelve los datos de Spark como bloques NumPy contiguos de como máximo `chunk_rows` filas.
+
+    Pensado para las métricas incrementales (p. ej. `AcumuladorMetricas.update`) sobre datos
+    que no caben en el driver.
+
+    Args:
+        sdf (pyspark.sql.DataFrame): Datos de Spark.
+        columns (list): Columnas numéricas a traer.
+        chunk_rows (int, opcional): Filas máximas por bloque.
+        dtype (np.dtype, opcional): Tipo de los arrays de salida.
+
+    Yields:
+        np.ndarray: Bloques C-contiguos de forma (filas, len(columns)).
+    """
+    chunk = np.empty((chunk_rows, len(columns)), dtype=dtype)
+    filled = 0
+    for batch in iter_arrow_batches(sdf, columns):
+        offset = 0
+        while offset < batch.num_rows:
+            take = min(chunk_rows - filled, batch.num_rows - offset)
+            part = batch.slice(offset, take)
+            for j in range(len(columns)):
+                chunk[filled:filled + take, j] = part.column(j).to_numpy(zero_copy_only=False)
+            filled += take
+            offset += take
+            if filled == chunk_rows:
+                yield chunk
+                chunk = np.empty((chunk_rows, len(columns)), dtype=dtype)
+                filled = 0
+    if filled:
+        yield chunk[:filled]
+
+def spark_to_numpy(sdf, columns, dtype=np.float64, layout='matrix'):
+    """
+    Trae columnas numéricas de Spark a NumPy con Arrow, escribiendo en un buffer preasignado.
+
+    Args:
+        sdf (pyspark.sql.DataFrame): Datos de Spark.
+        columns (list): Columnas numéricas a traer.
+        dtype (np.dtype, opcional): Tipo de los arrays de salida.
+        layout (str, opcional): 'matrix' para una matriz C-contigua (n, len(columns)) (p. ej. `data` de
+            `evaluate_clustering`) o 'columns' para un diccionario de vectores contiguos
+            (p. ej. `ytest` y `prediccio` de `metriques`).
+
+    Returns:
+        np.ndarray o dict: Datos en el formato pedido.
+    """
+    sdf = sdf.select(*columns)
+    n = sdf.count()  # Tamaño exacto para preasignar la salida sin copias intermedias
+
+    if layout == 'matrix':
+        out = np.empty((n, len(columns)), dtype=dtype)
+        targets = [out[:, j] for j in range(len(columns))]
+    elif layout == 'columns':
+        out = {column: np.empty(n, dtype=dtype) for column in columns}
+        targets = [out[column] for column in columns]
+    else:
+        raise ValueError(f"layout debe ser 'matrix' o 'columns', se recibió '{layout}'")
+
+    position = 0
+    for batch in iter_arrow_batches(sdf):
+        if position + batch.num_rows > n:  # Se comprueba antes de escribir fuera del buffer preasignado
+            raise RuntimeError(f"Se esperaban {n} filas y se recibieron más (¿los datos cambiaron durante la lectura?)")
+        for target, array in zip(targets, batch.columns):
+            target[position:position + batch.num_rows] = array.to_numpy(zero_copy_only=False)
+        position += batch.num_rows
+    if position != n:
+        raise RuntimeError(f"Se esperaban {n} filas y se recibieron {position} (¿los datos cambiaron durante la lectura?)")
+
+    return out
+
+def spark_to_pandas(sdf, columns=None):
+    """
+    Convierte a pandas solo las columnas necesarias usando Arrow (p. ej. para `describe_clusters`).
+
+    Args:
+        sdf (pyspark.sql.DataFrame): Datos de Spark.
+        columns (list, opcional): Columnas a traer (por defecto, todas).
+
+    Returns:
+        pd.DataFrame: Datos en pandas.
+    """
+    batches = list(iter_arrow_batches(sdf, columns))
+    if not batches:
+        selected = sdf.select(*columns) if columns is not None else sdf
+        return selected.limit(0).toPandas()
+    return pa.Table.from_batches(batches).to_pandas(split_blocks=True, self_destruct=True)
+
+# Notas sobre el uso:
+# -------------------
+# 1. Ejemplos:
+#    - Regresión:   cols = spark_to_numpy(sdf, ['y', 'pred'], layout='columns')
+#                   metriques('modelo', df, cols['y'], cols['pred'])
+#    - En streaming: acc = AcumuladorMetricas()
+#                   for bloque in iter_numpy_chunks(sdf, ['y', 'pred']): acc.update(bloque[:, 0], bloque[:, 1])
+#    - Clustering:  data = spark_to_numpy(sdf, feature_columns)
+#    - Perfiles:    describe_clusters(spark_to_pandas(sdf, ['cluster', 'metric_column', ...]), km)
+#
+# 2. Memoria:
+#    - `iter_arrow_batches` e `iter_numpy_chunks` mantienen en el driver una partición o un bloque cada vez.
+#    - `spark_to_numpy` solo guarda la salida final y una partición en tránsito (sin la copia extra de `toPandas()`).
+#
+# 3. Requisitos:
+#    - pyarrow instalado en el driver y en los executors; Spark >= 3.3 para la lectura rápida con `mapInArrow`.
+#      En versiones anteriores se leen filas con `toLocalIterator` en lotes de `batch_rows`: más lento, pero sin
+#      recoger todos los datos en el driver.
+#    - Solo se usan APIs públicas de PySpark (`mapInArrow`, `toLocalIterator`, `toPandas`).
\ No newline at end of file
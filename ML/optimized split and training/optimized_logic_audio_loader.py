@@ -0,0 +1,118 @@
+# Importaciones necesarias
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import torch
+
+# Función para cargar tensores de audio
+def cargar_tensor_de_audio_desde_ruta(ruta_archivo):
+    """
+    Carga un tensor de audio desde una ruta de archivo específica.
+
+    Args:
+        ruta_archivo (str): Ruta del archivo de audio.
+
+    Returns:
+        tensor: El tensor de audio cargado o None si ocurre un error.
+    """
+    try:
+        tensor = torch.load(ruta_archivo)
+        return tensor
+    except Exception as e:
+        print(f"Error al cargar el tensor desde {ruta_archivo}: {str(e)}")
+        return None
+
+def _cargar_con_prefetch(rutas, max_workers, prefetch):
+    """
+    Carga las rutas en un pool de hilos manteniendo como máximo `prefetch` lecturas en vuelo.
+
+    Yields:
+        tuple: (posición de la ruta, tensor o None), en el orden de `rutas`.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pendientes = deque()
+        siguientes = iter(enumerate(rutas))
+        for posicion, ruta in siguientes:
+            pendientes.append((posicion, executor.submit(cargar_tensor_de_audio_desde_ruta, ruta)))
+            if len(pendientes) >= prefetch:
+                break
+        while pendientes:
+            posicion, futuro = pendientes.popleft()
+            siguiente = next(siguientes, None)
+            if siguiente is not None:
+                pendientes.append((siguiente[0], executor.submit(cargar_tensor_de_audio_desde_ruta, siguiente[1])))
+            yield posicion, futuro.result()
+
+def volcar_tensores(rutas, reservar, max_workers=8, prefetch=64):
+    """
+    Carga una sola vez cada ruta distinta y escribe cada tensor aplanado en su fila de un destino preasignado.
+
+    Las rutas repetidas o vacías se descartan antes de leer. La lectura se hace con un pool de hilos
+    (`torch.load` pasa la mayor parte del tiempo en E/S y en código nativo) y con prefetch acotado.
+    Los tensores se agrupan por forma: cada forma distinta tiene su propio destino, de modo que
+    ningún tensor se descarta por no coincidir con el primero.
+
+    Args:
+        rutas (iterable): Rutas de los archivos de tensores.
+        reservar (callable): `reservar(n_filas, muestra)` crea el destino 2D (tensor, array o memmap) de una
+            forma a partir del número máximo de filas y del primer tensor de esa forma, ya aplanado.
+        max_workers (int, opcional): Hilos de lectura.
+        prefetch (int, opcional): Lecturas en vuelo como máximo (acota la memoria de tensores pendientes).
+
+    Returns:
+        dict: {forma: (destino, lista con la ruta de cada fila escrita)}, vacío si no se cargó nada.
+            Las rutas que no se pudieron cargar no aparecen.
+    """
+    rutas_unicas = pd.unique(pd.Series(list(rutas), dtype=object).dropna())
+    rutas_unicas = [ruta for ruta in rutas_unicas if ruta]
+
+    bloques = {}
+    for posicion, tensor in _cargar_con_prefetch(rutas_unicas, max_workers, max(1, prefetch)):
+        if tensor is None:
+            continue
+        forma = tuple(tensor.shape)
+        if forma not in bloques:
+            # Como máximo caben aquí las rutas que quedan por leer
+            bloques[forma] = (reservar(len(rutas_unicas) - posicion, tensor.reshape(-1)), [])
+        destino, cargadas = bloques[forma]
+        destino[len(cargadas)] = tensor.reshape(-1)
+        cargadas.append(rutas_unicas[posicion])
+    return bloques
+
+def cargar_tensores_en_bloque(rutas, max_workers=8, prefetch=64):
+    """
+    Carga las rutas (ver `volcar_tensores`) en un tensor contiguo preasignado por forma, sin `torch.stack`.
+
+    Args:
+        rutas (iterable): Rutas de los archivos de tensores (p. ej. las de un tipo de característica).
+        max_workers (int, opcional): Hilos de lectura.
+        prefetch (int, opcional): Lecturas en vuelo como máximo.
+
+    Returns:
+        dict: {forma: (tensor (n_cargados, n_valores) contiguo, pd.Index con la ruta de cada fila)}.
+    """
+    bloques = volcar_tensores(
+        rutas, lambda n_filas, muestra: torch.empty((n_filas, muestra.numel()), dtype=muestra.dtype),
+        max_workers, prefetch,
+    )
+    resultado = {}
+    for forma, (X, cargadas) in bloques.items():
+        if len(cargadas) < len(X):
+            X = X[:len(cargadas)].clone()  # Solo si sobran filas (fallos u otras formas): se libera la parte sin usar
+        resultado[forma] = (X, pd.Index(cargadas, dtype=object))
+    return resultado
+
+# Notas sobre el uso:
+# -------------------
+# 1. Ejemplo (un tipo de característica cada vez, como en `procesar_datos`):
+#    rutas_tipo = dataset.loc[dataset['subfolder'] == 'type_a', 'filepath']
+#    bloques = cargar_tensores_en_bloque(rutas_tipo, max_workers=16)
+#    (forma, (X, rutas)), = bloques.items()          # Falla si los tensores del tipo tienen formas distintas
+#    filas = rutas.get_indexer(rutas_tipo)            # -1 si no se cargó
+#
+# 2. Rendimiento:
+#    - Cada archivo se lee una sola vez aunque aparezca en varias combinaciones de características.
+#    - La memoria máxima es el tensor final más `prefetch` tensores en vuelo (con varias formas, cada bloque
+#      se reserva para las rutas que quedaban por leer y se recorta al terminar).
+#    - Con `volcar_tensores` el destino puede ser un memmap en disco (ver `optimized_logic_feature_store.py`).
+#    - En discos de red o con muchos archivos pequeños, subir `max_workers` suele acelerar la carga.
@@ -0,0 +1,295 @@
+# Importaciones necesarias
+import json
+import os
+import numpy as np
+import pandas as pd
+from optimized_logic_audio_loader import volcar_tensores
+
+# Archivos del almacén de características
+ARCHIVO_MATRIZ = 'caracteristicas.npy'  # Primer fragmento de la matriz (n_archivos, n_valores), una fila por tensor aplanado
+ARCHIVO_INDICE = 'indice.json'          # Fragmentos y ruta, fecha de modificación y tamaño del origen de cada fila, en orden
+
+def _estado_archivo(ruta):
+    """
+    (fecha de modificación en ns, tamaño en bytes) de `ruta`, o None si no se puede consultar.
+    """
+    try:
+        estado = os.stat(ruta)
+    except OSError:
+        return None
+    return estado.st_mtime_ns, estado.st_size
+
+def leer_indice(directorio_almacen):
+    """
+    Índice del almacén: {'rutas': [...], 'mtime': [...], 'tamano': [...], 'fragmentos': [...]}.
+
+    `fragmentos` lista los archivos `.npy` de la matriz en el orden de las filas ({'archivo', 'filas'});
+    'mtime' y 'tamano' valen None si no se registró el estado del archivo.
+    """
+    with open(os.path.join(directorio_almacen, ARCHIVO_INDICE)) as f:
+        indice = json.load(f)
+    n = len(indice['rutas'])
+    return {
+        'rutas': indice['rutas'],
+        'mtime': indice.get('mtime', [None] * n),
+        'tamano': indice.get('tamano', [None] * n),
+        'fragmentos': indice.get('fragmentos', [{'archivo': ARCHIVO_MATRIZ, 'filas': n}]),
+    }
+
+def _escribir_indice(directorio_almacen, indice):
+    """
+    Sustituye el índice del almacén de forma atómica (archivo temporal + `os.replace`).
+    """
+    ruta_indice = os.path.join(directorio_almacen, ARCHIVO_INDICE)
+    with open(ruta_indice + '.tmp', 'w') as f:
+        json.dump(indice, f)
+    os.replace(ruta_indice + '.tmp', ruta_indice)
+
+class MatrizAlmacen:
+    """
+    Matriz de solo lectura formada por varios fragmentos `.npy` proyectados en memoria.
+
+    Se indexa por filas como un array: una rebanada contenida en un fragmento devuelve una vista
+    del memmap; una rebanada que cruza fragmentos o una lista de filas devuelve una copia con solo
+    las filas pedidas.
+
+    Args:
+        fragmentos (list): Memmaps (n_i, n_valores) en el orden de las filas.
+    """
+
+    def __init__(self, fragmentos):
+        self.fragmentos = fragmentos
+        self.inicios = np.concatenate([[0], np.cumsum([len(fragmento) for fragmento in fragmentos])])
+        self.shape = (int(self.inicios[-1]), fragmentos[0].shape[1])
+        self.dtype = fragmentos[0].dtype
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, filas):
+        if isinstance(filas, slice):
+            inicio, fin, paso = filas.indices(len(self))
+            f = np.searchsorted(self.inicios, inicio, side='right') - 1
+            if paso == 1 and inicio < fin <= self.inicios[f + 1]:
+                return self.fragmentos[f][inicio - self.inicios[f]:fin - self.inicios[f]]
+            filas = np.arange(inicio, fin, paso)
+        if np.ndim(filas) == 0:
+            fila = int(filas) % len(self)
+            f = np.searchsorted(self.inicios, fila, side='right') - 1
+            return self.fragmentos[f][fila - self.inicios[f]]
+
+        filas = np.asarray(filas)
+        filas = np.flatnonzero(filas) if filas.dtype == bool else filas.astype(np.int64) % len(self)
+        salida = np.empty((len(filas), self.shape[1]), dtype=self.dtype)
+        fragmento = np.searchsorted(self.inicios, filas, side='right') - 1
+        for f in np.unique(fragmento):  # Una lectura por fragmento con las filas que le corresponden
+            mascara = fragmento == f
+            salida[mascara] = self.fragmentos[f][filas[mascara] - self.inicios[f]]
+        return salida
+
+def abrir_almacen(directorio_almacen):
+    """
+    Abre el almacén de características sin leerlo: los fragmentos se proyectan en memoria (solo lectura).
+
+    Args:
+        directorio_almacen (str): Directorio creado por `construir_almacen`.
+
+    Returns:
+        tuple: (matriz (n_archivos, n_valores) respaldada por el disco: un np.memmap si el almacén tiene un
+            solo fragmento o una `MatrizAlmacen` si tiene varios, pd.Index con la ruta de cada fila).
+    """
+    indice = leer_indice(directorio_almacen)
+    fragmentos = [
+        np.load(os.path.join(directorio_almacen, fragmento['archivo']), mmap_mode='r')[:fragmento['filas']]
+        for fragmento in indice['fragmentos']  # Las filas sobrantes de cada fragmento (fallos de carga) no se exponen
+    ]
+    X = fragmentos[0] if len(fragmentos) == 1 else MatrizAlmacen(fragmentos)
+    return X, pd.Index(indice['rutas'], dtype=object)
+
+def _volcar_fragmento(rutas, ruta_fragmento, referencia, max_workers, prefetch):
+    """
+    Escribe los tensores de `rutas` en un fragmento `.npy` nuevo (temporal + `os.replace`).
+
+    Args:
+        referencia (np.ndarray): Fragmento existente cuyo ancho y tipo debe respetar el nuevo, o None.
+
+    Returns:
+        list: Ruta de cada fila escrita (vacía si no se cargó nada y no se creó el fragmento).
+    """
+    ruta_temporal = ruta_fragmento + '.tmp.npy'
+    reservado = []
+
+    def reservar(n_filas, muestra):
+        muestra = np.asarray(muestra)
+        if reservado:  # Ya se reservó el destino para otra forma
+            raise ValueError("Los tensores tienen formas distintas y el almacén solo admite una; usa un almacén por forma")
+        if referencia is not None and referencia.shape[1] != muestra.shape[0]:
+            raise ValueError(
+                f"Los tensores nuevos tienen {muestra.shape[0]} valores y el almacén {referencia.shape[1]}; "
+                "reconstrúyelo con actualizar=False"
+            )
+        dtype = referencia.dtype if referencia is not None else muestra.dtype
+        reservado.append(True)
+        return np.lib.format.open_memmap(ruta_temporal, mode='w+', dtype=dtype, shape=(n_filas, muestra.shape[0]))
+
+    if os.path.exists(ruta_temporal):
+        os.remove(ruta_temporal)  # Restos de una ejecución interrumpida
+    try:
+        bloques = volcar_tensores(rutas, reservar, max_workers, prefetch)
+    except Exception:
+        if os.path.exists(ruta_temporal):
+            os.remove(ruta_temporal)
+        raise
+    destino, cargadas = next(iter(bloques.values()), (None, []))
+    del bloques
+    if destino is None:
+        return []
+    destino.flush()
+    del destino  # Se libera la proyección antes de renombrar (Windows no lo permite con el archivo abierto)
+    os.replace(ruta_temporal, ruta_fragmento)
+    return cargadas
+
+def _reescribir_filas(directorio_almacen, indice, posiciones, referencia, max_workers, prefetch):
+    """
+    Vuelve a leer los archivos modificados y reescribe sus filas en su sitio (`mmap_mode='r+'`).
+
+    Args:
+        posiciones (dict): {ruta: fila del almacén}.
+
+    Returns:
+        list: Rutas reescritas (las que no se pudieron cargar conservan su fila anterior).
+    """
+    def reservar(n_filas, muestra):
+        if muestra.shape[0] != referencia.shape[1]:
+            raise ValueError(
+                f"Los tensores modificados tienen {muestra.shape[0]} valores y el almacén {referencia.shape[1]}; "
+                "reconstrúyelo con actualizar=False"
+            )
+        return np.empty((n_filas, referencia.shape[1]), dtype=referencia.dtype)  # Solo los archivos modificados
+
+    inicios = np.cumsum([0] + [fragmento['filas'] for fragmento in indice['fragmentos']])
+    abiertos, reescritas = {}, []
+    for bloque, cargadas in volcar_tensores(list(posiciones), reservar, max_workers, prefetch).values():
+        for fila, ruta in enumerate(cargadas):
+            posicion = posiciones[ruta]
+            f = int(np.searchsorted(inicios, posicion, side='right') - 1)
+            if f not in abiertos:
+                archivo = os.path.join(directorio_almacen, indice['fragmentos'][f]['archivo'])
+                abiertos[f] = np.load(archivo, mmap_mode='r+')
+            abiertos[f][posicion - inicios[f]] = bloque[fila]
+            reescritas.append(ruta)
+    for X in abiertos.values():
+        X.flush()
+    return reescritas
+
+def construir_almacen(rutas, directorio_almacen, max_workers=8, prefetch=64, actualizar=True):
+    """
+    Crea (o actualiza) el almacén de características a partir de los tensores de audio originales.
+
+    Los tensores se leen en paralelo (ver `volcar_tensores`) y se escriben directamente en un `.npy`
+    proyectado en memoria, sin tenerlos todos en RAM. Si el almacén ya existe y `actualizar` es True,
+    el coste es proporcional a los archivos nuevos y modificados, no al tamaño del almacén: las filas de
+    archivos modificados (fecha de modificación o tamaño distintos de los del índice) se reescriben en
+    su sitio y las de archivos nuevos se añaden en un fragmento `.npy` nuevo, sin copiar las existentes.
+
+    El almacén guarda tensores de una sola forma: usa uno por tipo de característica (p. ej. un
+    subdirectorio por tipo, como `procesar_datos`).
+
+    Args:
+        rutas (iterable): Rutas de los archivos de tensores.
+        directorio_almacen (str): Directorio del almacén.
+        max_workers (int, opcional): Hilos de lectura.
+        prefetch (int, opcional): Lecturas en vuelo como máximo.
+        actualizar (bool, opcional): Reutilizar las filas de un almacén existente. Si es False, se reconstruye
+            en un único fragmento (lo que también compacta los fragmentos acumulados).
+
+    Returns:
+        str: Directorio del almacén.
+    """
+    os.makedirs(directorio_almacen, exist_ok=True)
+    ruta_matriz = os.path.join(directorio_almacen, ARCHIVO_MATRIZ)
+    existe = os.path.exists(ruta_matriz) and os.path.exists(os.path.join(directorio_almacen, ARCHIVO_INDICE))
+
+    rutas_pedidas = pd.Index(pd.unique(pd.Series(list(rutas), dtype=object).dropna()), dtype=object)
+    estados = {ruta: _estado_archivo(ruta) for ruta in rutas_pedidas}
+
+    if not (actualizar and existe):
+        # Construcción completa en un único fragmento, que sustituye al almacén anterior
+        anteriores = [fragmento['archivo'] for fragmento in leer_indice(directorio_almacen)['fragmentos']] if existe else []
+        cargadas = _volcar_fragmento(list(rutas_pedidas), ruta_matriz, None, max_workers, prefetch)
+        if not cargadas:
+            raise ValueError("No se pudo cargar ningún tensor para construir el almacén")
+        _escribir_indice(directorio_almacen, {
+            'rutas': cargadas,
+            'mtime': [estados[ruta][0] if estados[ruta] else None for ruta in cargadas],
+            'tamano': [estados[ruta][1] if estados[ruta] else None for ruta in cargadas],
+            'fragmentos': [{'archivo': ARCHIVO_MATRIZ, 'filas': len(cargadas)}],
+        })
+        for archivo in anteriores:
+            if archivo != ARCHIVO_MATRIZ and os.path.exists(os.path.join(directorio_almacen, archivo)):
+                os.remove(os.path.join(directorio_almacen, archivo))
+        return directorio_almacen
+
+    # Rutas pedidas que no están en el almacén y rutas cuyo archivo cambió desde que se leyó
+    indice = leer_indice(directorio_almacen)
+    rutas_previas = pd.Index(indice['rutas'], dtype=object)
+    rutas_nuevas = list(rutas_pedidas[~rutas_pedidas.isin(rutas_previas)])
+    posiciones_cambiadas = {}
+    for posicion in rutas_previas.get_indexer(rutas_pedidas[rutas_pedidas.isin(rutas_previas)]):
+        ruta = indice['rutas'][posicion]
+        if estados[ruta] is not None and estados[ruta] != (indice['mtime'][posicion], indice['tamano'][posicion]):
+            posiciones_cambiadas[ruta] = posicion
+    if not rutas_nuevas and not posiciones_cambiadas:
+        return directorio_almacen  # Nada que añadir ni que refrescar
+
+    referencia = np.load(ruta_matriz, mmap_mode='r')  # Solo para el ancho y el tipo de las filas
+
+    # Archivos modificados: se reescriben en su fila, de modo que los índices de fila guardados siguen valiendo.
+    # Un archivo que no se pudo recargar conserva su estado anterior y se vuelve a intentar en la siguiente actualización
+    leidas = {}
+    if posiciones_cambiadas:
+        for ruta in _reescribir_filas(directorio_almacen, indice, posiciones_cambiadas, referencia, max_workers, prefetch):
+            leidas[ruta] = posiciones_cambiadas[ruta]
+
+    # Archivos nuevos: un fragmento nuevo a continuación de las filas existentes
+    if rutas_nuevas:
+        archivo = f"caracteristicas_{len(indice['fragmentos']):04d}.npy"
+        cargadas = _volcar_fragmento(rutas_nuevas, os.path.join(directorio_almacen, archivo), referencia,
+                                     max_workers, prefetch)
+        if cargadas:
+            leidas.update({ruta: len(indice['rutas']) + i for i, ruta in enumerate(cargadas)})
+            indice['rutas'] += cargadas
+            indice['mtime'] += [None] * len(cargadas)
+            indice['tamano'] += [None] * len(cargadas)
+            indice['fragmentos'].append({'archivo': archivo, 'filas': len(cargadas)})
+    del referencia
+
+    for ruta, posicion in leidas.items():
+        indice['mtime'][posicion], indice['tamano'][posicion] = estados[ruta] or (None, None)
+    _escribir_indice(directorio_almacen, indice)
+    return directorio_almacen
+
+# Notas sobre el uso:
+# -------------------
+# 1. Ejemplo (un almacén por tipo de característica):
+#    rutas_tipo = dataset.loc[dataset['subfolder'] == 'type_a', 'filepath']
+#    construir_almacen(rutas_tipo, 'ruta/a/tu/almacen/type_a')      # Una vez (y tras añadir o modificar audios)
+#    X, rutas = abrir_almacen('ruta/a/tu/almacen/type_a')          # Instantáneo: no lee la matriz
+#    filas = rutas.get_indexer(rutas_tipo)                          # -1 si el archivo no está en el almacén
+#    X_subconjunto = X[filas[filas >= 0]]                           # Solo se leen del disco las filas pedidas
+#
+# 2. Formato:
+#    - `caracteristicas.npy` y `caracteristicas_0001.npy`, `_0002`...: fragmentos de la matriz, matrices NumPy
+#      estándar legibles con `np.load(..., mmap_mode='r')` sin deserializar.
+#    - `indice.json`: fragmentos con su número de filas y rutas en el orden de las filas, con la fecha de
+#      modificación (ns) y el tamaño de cada archivo.
+#
+# 3. Actualización:
+#    - Con actualizar=True solo se leen y escriben los tensores de rutas que no estaban (en un fragmento nuevo)
+#      y los de archivos cuya fecha de modificación o tamaño cambió (reescritos en su fila con `mmap_mode='r+'`):
+#      el coste no depende del tamaño del almacén y los índices de fila guardados siguen siendo válidos.
+#    - Cada actualización con archivos nuevos añade un fragmento; leer filas de varios fragmentos cuesta una
+#      lectura por fragmento. Reconstruir con actualizar=False (coste proporcional a todo el almacén) los
+#      compacta en uno.
+#    - El índice se sustituye de forma atómica al terminar: una actualización interrumpida no deja filas sin índice
+#      y los archivos modificados se vuelven a leer en la siguiente.
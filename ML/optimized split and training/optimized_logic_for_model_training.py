@@ -3,6 +3,8 @@ import os
 import pickle
 from sklearn.metrics import confusion_matrix
 import numpy as np
+from optimized_logic_splits import ParticionIndices
+from optimized_logic_scheduler import ejecutar_rejilla
 
 # Directorios base
 base_directory = "ruta/a/tu/directorio/train_test_split"
@@ -14,9 +16,6 @@ combinaciones_caracteristicas = ['caracteristica_1', 'caracteristica_2', 'caract
 # Tipos de características
 tipos_caracteristicas = ['tipo_a', 'tipo_b']
 
-# Contador para identificar modelos
-modelo_counter = 1
-
 # # Función para entrenar un modelo (ejemplo genérico)
 # def entrenar_modelo(X_train, y_train):
 #     """
@@ -35,54 +34,78 @@ modelo_counter = 1
 #     return modelo
 
 
+# Función que entrena una combinación (un trabajo de la rejilla)
+def entrenar_combinacion(directorio_caracteristica, modelos_directory, modelo_nombre, funcion_entrenamiento=None):
+    """
+    Entrena y guarda el modelo de una combinación (característica, tipo).
+
+    Args:
+        directorio_caracteristica (str): Directorio con la partición por índices de la combinación.
+        modelos_directory (str): Directorio donde se guardará el modelo.
+        modelo_nombre (str): Nombre del archivo del modelo (sin extensión).
+        funcion_entrenamiento (callable, opcional): Función `(X_train, y_train) -> modelo` de nivel de módulo;
+            por defecto, `entrenar_modelo`.
+
+    Returns:
+        str: Ruta del modelo guardado.
+    """
+    entrenar = funcion_entrenamiento or entrenar_modelo
+
+    # Abrir la partición por índices: los conjuntos se leen del disco al usarlos
+    particion = ParticionIndices(directorio_caracteristica)
+
+    # Aquí podrías definir y entrenar un modelo (modificar según necesidades)
+    modelo = entrenar(particion.X_train, particion.y_train)
+
+    # Calcular métricas del modelo
+    y_pred = modelo.predict(particion.X_test)
+
+    # Guardar el modelo entrenado en un archivo pickle
+    ruta_modelo = os.path.join(modelos_directory, f"{modelo_nombre}.pkl")
+    with open(ruta_modelo, 'wb') as f:
+        pickle.dump(modelo, f)
+    return ruta_modelo
+
 # Función para procesar combinaciones de características
-def procesar_combinaciones(base_directory, modelos_directory, combinaciones_caracteristicas, tipos_caracteristicas):
+def procesar_combinaciones(base_directory, modelos_directory, combinaciones_caracteristicas, tipos_caracteristicas,
+                           funcion_entrenamiento=None, max_procesos=None):
     """
-    Itera a través de combinaciones de características y tipos, carga datos, entrena modelos,
-    y guarda los resultados y métricas en archivos pickle.
+    Recorre las combinaciones de características y tipos, carga datos, entrena modelos
+    y guarda cada modelo en un archivo pickle.
+
+    Los datos de cada combinación se leen de la partición por índices que guarda `procesar_datos`
+    (ver `optimized_logic_splits.py`). Las combinaciones se entrenan en paralelo con `ejecutar_rejilla`
+    y cada modelo recibe un nombre determinista, 'modelo_<característica>_<tipo>', de modo que
+    el resultado no depende del orden de ejecución.
 
     Args:
         base_directory (str): Directorio base donde se encuentran los datos.
         modelos_directory (str): Directorio donde se guardarán los modelos.
         combinaciones_caracteristicas (list): Lista de características a iterar.
         tipos_caracteristicas (list): Lista de tipos de características.
+        funcion_entrenamiento (callable, opcional): Función de entrenamiento (ver `entrenar_combinacion`).
+        max_procesos (int, opcional): Combinaciones entrenadas a la vez (por defecto, los núcleos disponibles).
+
+    Returns:
+        pd.DataFrame: Resumen por combinación con estado, segundos, error y ruta del modelo ('resultado').
     """
-    global modelo_counter
+    os.makedirs(modelos_directory, exist_ok=True)
 
+    trabajos = []
     for caracteristica in combinaciones_caracteristicas:
         for tipo_caracteristica in tipos_caracteristicas:
             # Ruta específica para la combinación actual
             directorio_caracteristica = os.path.join(base_directory, caracteristica, tipo_caracteristica)
-
-            try:
-                # Cargar datos desde archivos pickle
-                with open(os.path.join(directorio_caracteristica, 'X_train.pkl'), 'rb') as f:
-                    X_train = pickle.load(f)
-                with open(os.path.join(directorio_caracteristica, 'X_test.pkl'), 'rb') as f:
-                    X_test = pickle.load(f)
-                with open(os.path.join(directorio_caracteristica, 'y_train.pkl'), 'rb') as f:
-                    y_train = pickle.load(f)
-                with open(os.path.join(directorio_caracteristica, 'y_test.pkl'), 'rb') as f:
-                    y_test = pickle.load(f)
-
-                # Aquí podrías definir y entrenar un modelo (modificar según necesidades)
-                modelo = entrenar_modelo(X_train, y_train)
-
-                # Generar un nombre único para el modelo
-                modelo_nombre = f"modelo_{modelo_counter}"
-                modelo_counter += 1
-
-                # Calcular métricas del modelo
-                y_pred = modelo.predict(X_test)
-
-                # Guardar el modelo entrenado en un archivo pickle
-                ruta_modelo = os.path.join(modelos_directory, f"{modelo_nombre}.pkl")
-                with open(ruta_modelo, 'wb') as f:
-                    pickle.dump(modelo, f)
-
-
-            except Exception as e:
-                print(f"Error al procesar {caracteristica}, {tipo_caracteristica}: {str(e)}")
-                continue
-
-
+            ruta_X = os.path.join(directorio_caracteristica, 'X_lda.npy')
+            memoria_gb = 3 * os.path.getsize(ruta_X) / 1024 ** 3 if os.path.exists(ruta_X) else None
+
+            clave = {'caracteristica': caracteristica, 'tipo': tipo_caracteristica}
+            kwargs = {
+                'directorio_caracteristica': directorio_caracteristica,
+                'modelos_directory': modelos_directory,
+                'modelo_nombre': f"modelo_{caracteristica}_{tipo_caracteristica}",
+                'funcion_entrenamiento': funcion_entrenamiento,
+            }
+            trabajos.append((clave, kwargs, memoria_gb))
+
+    return ejecutar_rejilla(entrenar_combinacion, trabajos, max_procesos)
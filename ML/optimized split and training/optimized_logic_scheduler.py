@@ -0,0 +1,134 @@
+# Importaciones necesarias
+import os
+import time
+import traceback
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+import pandas as pd
+
+def memoria_disponible_gb():
+    """
+    Memoria disponible en el sistema en GB (MemAvailable de /proc/meminfo, o páginas libres si no existe).
+    """
+    try:
+        with open('/proc/meminfo') as f:
+            for linea in f:
+                if linea.startswith('MemAvailable:'):
+                    return int(linea.split()[1]) / 1024 ** 2
+    except OSError:
+        pass
+    if hasattr(os, 'sysconf'):
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_AVPHYS_PAGES') / 1024 ** 3
+    return float('inf')
+
+def _ejecutar_trabajo(funcion, kwargs):
+    """
+    Ejecuta un trabajo en el proceso hijo y devuelve (estado, segundos, error, resultado) sin propagar excepciones.
+    """
+    inicio = time.perf_counter()
+    try:
+        resultado = funcion(**kwargs)
+        return 'ok', time.perf_counter() - inicio, None, resultado
+    except Exception:
+        return 'error', time.perf_counter() - inicio, traceback.format_exc(limit=5), None
+
+def ejecutar_rejilla(funcion, trabajos, max_workers=None, reserva_memoria_gb=1.0):
+    """
+    Ejecuta trabajos independientes en un pool de procesos con admisión según la memoria disponible.
+
+    Un trabajo solo se lanza si hay un proceso libre y si la memoria comprometida (la suma de las
+    estimaciones de los trabajos en curso) más la suya cabe en la memoria disponible al empezar,
+    descontada la reserva. Si no cabe, se espera a que termine otro (con ningún trabajo en curso se
+    lanza igualmente, para no bloquear la rejilla).
+
+    Si un proceso muere (p. ej. lo termina el sistema por falta de memoria), el pool queda inutilizable:
+    los trabajos en curso que no llegaron a terminar se registran como 'error' y el resto de la rejilla
+    continúa en un pool nuevo.
+
+    Args:
+        funcion (callable): Función de nivel de módulo (serializable) que ejecuta un trabajo.
+        trabajos (list): Tuplas (clave, kwargs, memoria_gb): `clave` es un dict que identifica el trabajo
+            en el resumen, `kwargs` los argumentos de `funcion` y `memoria_gb` su memoria estimada (o None).
+        max_workers (int, opcional): Procesos simultáneos (por defecto, los núcleos disponibles).
+            Con 1 los trabajos se ejecutan en el propio proceso.
+        reserva_memoria_gb (float, opcional): Memoria que se deja libre para el sistema.
+
+    Returns:
+        pd.DataFrame: Una fila por trabajo con las columnas de la clave, 'estado' ('ok' o 'error'),
+            'segundos', 'error' (traza si falló) y 'resultado'.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    filas = [None] * len(trabajos)  # El resumen sigue el orden de `trabajos`, no el de finalización
+
+    def registrar(posicion, salida):
+        estado, segundos, error, resultado = salida
+        clave = trabajos[posicion][0]
+        filas[posicion] = {**clave, 'estado': estado, 'segundos': segundos, 'error': error, 'resultado': resultado}
+
+    if max_workers == 1:
+        for posicion, (_, kwargs, _) in enumerate(trabajos):
+            registrar(posicion, _ejecutar_trabajo(funcion, kwargs))
+        return pd.DataFrame(filas)
+
+    pendientes = deque(enumerate(trabajos))
+    presupuesto_gb = memoria_disponible_gb() - reserva_memoria_gb  # Medida antes de lanzar ningún trabajo
+    en_curso = {}  # futuro -> (posición del trabajo, memoria estimada)
+    executor = ProcessPoolExecutor(max_workers=max_workers)
+    try:
+        while pendientes or en_curso:
+            # Admitir trabajos mientras haya procesos libres y la memoria comprometida lo permita
+            comprometida_gb = sum(memoria_gb for _, memoria_gb in en_curso.values())
+            while pendientes and len(en_curso) < max_workers:
+                posicion, (_, kwargs, memoria_gb) = pendientes[0]
+                memoria_gb = memoria_gb or 0.0
+                if en_curso and comprometida_gb + memoria_gb > presupuesto_gb:
+                    break
+                pendientes.popleft()
+                en_curso[executor.submit(_ejecutar_trabajo, funcion, kwargs)] = (posicion, memoria_gb)
+                comprometida_gb += memoria_gb
+
+            terminados, _ = wait(en_curso, return_when=FIRST_COMPLETED)
+            roto = False
+            while terminados:
+                for futuro in terminados:
+                    posicion, _ = en_curso.pop(futuro)
+                    try:
+                        registrar(posicion, futuro.result())
+                    except BrokenProcessPool as e:
+                        registrar(posicion, ('error', None, f"BrokenProcessPool: {e}", None))
+                        roto = True
+                # Con el pool roto, todos los trabajos en curso terminan (con su resultado o con el error)
+                terminados = wait(en_curso)[0] if roto else set()
+
+            if roto:
+                executor.shutdown(wait=True)
+                executor = ProcessPoolExecutor(max_workers=max_workers)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    return pd.DataFrame(filas)
+
+# Notas sobre el uso:
+# -------------------
+# 1. Ejemplo:
+#    trabajos = [({'caracteristica': c, 'tipo': t}, {'caracteristica': c, 'tipo': t}, 2.0)
+#                for c in caracteristicas for t in tipos]
+#    resumen = ejecutar_rejilla(procesar_una, trabajos, max_workers=4)
+#    print(resumen[resumen['estado'] == 'error'])
+#
+# 2. Requisitos:
+#    - `funcion` y los argumentos deben poder serializarse (funciones de nivel de módulo, datos sin conexiones).
+#    - En Windows/macOS (arranque 'spawn'), lanza el script dentro de `if __name__ == "__main__":`.
+#
+# 3. Memoria:
+#    - La estimación por trabajo la calcula quien llama (p. ej. a partir del tamaño de sus datos); sin
+#      estimación solo se limita el número de procesos.
+#    - El presupuesto es la memoria disponible al empezar menos la reserva; la memoria comprometida es la
+#      suma de las estimaciones de los trabajos en curso, no lo que marca el sistema en cada momento
+#      (los trabajos recién lanzados aún no han reservado su memoria).
+#
+# 4. Fallos:
+#    - Una excepción en `funcion` se registra como 'error' con su traza y no afecta al resto.
+#    - Si un proceso muere, los trabajos en curso sin terminar se registran como 'error' ('BrokenProcessPool')
+#      y los pendientes se ejecutan en un pool nuevo.
@@ -0,0 +1,114 @@
+# Importaciones necesarias
+import json
+import os
+import pickle
+import numpy as np
+from sklearn.model_selection import train_test_split
+
+# Archivos de una partición train-test por índices
+ARCHIVO_MANIFIESTO = 'particion.json'
+ARCHIVO_INDICES_TRAIN = 'indices_train.npy'
+ARCHIVO_INDICES_TEST = 'indices_test.npy'
+
+def guardar_particion(directorio, n_filas, origen_X='X_lda.npy', origen_y='y.pkl', test_size=0.2, random_state=42):
+    """
+    Divide en train-test guardando solo los índices de fila y un manifiesto, sin copiar los datos.
+
+    Los índices son los mismos que elegiría `train_test_split(X, y, test_size, random_state)`
+    sobre los datos completos.
+
+    Args:
+        directorio (str): Directorio de la combinación (característica, tipo).
+        n_filas (int): Número de filas de los datos de origen.
+        origen_X (str, opcional): Archivo `.npy` con la matriz de origen, relativo a `directorio`.
+        origen_y (str, opcional): Archivo pickle con las etiquetas, relativo a `directorio`.
+        test_size (float, opcional): Proporción de prueba.
+        random_state (int, opcional): Semilla de la división.
+
+    Returns:
+        tuple: (índices de entrenamiento, índices de prueba).
+    """
+    indices_train, indices_test = train_test_split(np.arange(n_filas), test_size=test_size, random_state=random_state)
+    np.save(os.path.join(directorio, ARCHIVO_INDICES_TRAIN), indices_train)
+    np.save(os.path.join(directorio, ARCHIVO_INDICES_TEST), indices_test)
+
+    manifiesto = {
+        'origen_X': origen_X,
+        'origen_y': origen_y,
+        'n_filas': int(n_filas),
+        'test_size': test_size,
+        'random_state': random_state,
+    }
+    with open(os.path.join(directorio, ARCHIVO_MANIFIESTO), 'w') as f:
+        json.dump(manifiesto, f, indent=2)
+    return indices_train, indices_test
+
+class ParticionIndices:
+    """
+    Partición train-test guardada con `guardar_particion`, materializada bajo demanda.
+
+    La matriz de origen se abre proyectada en memoria y cada conjunto se construye la primera vez
+    que se pide, leyendo del disco solo sus filas.
+
+    Args:
+        directorio (str): Directorio de la combinación (característica, tipo).
+    """
+
+    def __init__(self, directorio):
+        self.directorio = directorio
+        with open(os.path.join(directorio, ARCHIVO_MANIFIESTO)) as f:
+            self.manifiesto = json.load(f)
+        self.indices_train = np.load(os.path.join(directorio, ARCHIVO_INDICES_TRAIN))
+        self.indices_test = np.load(os.path.join(directorio, ARCHIVO_INDICES_TEST))
+        self._X, self._y, self._conjuntos = None, None, {}
+
+    @property
+    def X(self):
+        if self._X is None:
+            self._X = np.load(os.path.join(self.directorio, self.manifiesto['origen_X']), mmap_mode='r')
+            if len(self._X) != self.manifiesto['n_filas']:
+                raise ValueError(
+                    f"{self.manifiesto['origen_X']} tiene {len(self._X)} filas y la partición se hizo con "
+                    f"{self.manifiesto['n_filas']}; vuelve a generarla"
+                )
+        return self._X
+
+    @property
+    def y(self):
+        if self._y is None:
+            with open(os.path.join(self.directorio, self.manifiesto['origen_y']), 'rb') as f:
+                self._y = pickle.load(f)
+        return self._y
+
+    def _conjunto(self, nombre, datos, indices):
+        if nombre not in self._conjuntos:
+            self._conjuntos[nombre] = datos.iloc[indices] if hasattr(datos, 'iloc') else datos[indices]
+        return self._conjuntos[nombre]
+
+    @property
+    def X_train(self):
+        return self._conjunto('X_train', self.X, self.indices_train)
+
+    @property
+    def X_test(self):
+        return self._conjunto('X_test', self.X, self.indices_test)
+
+    @property
+    def y_train(self):
+        return self._conjunto('y_train', self.y, self.indices_train)
+
+    @property
+    def y_test(self):
+        return self._conjunto('y_test', self.y, self.indices_test)
+
+# Notas sobre el uso:
+# -------------------
+# 1. Ejemplo:
+#    guardar_particion(directorio, len(X_lda))          # En la preparación de los datos
+#    particion = ParticionIndices(directorio)           # En el entrenamiento
+#    modelo.fit(particion.X_train, particion.y_train)
+#
+# 2. Reproducibilidad:
+#    - `particion.json` guarda el origen, el número de filas, `test_size` y `random_state`; con ellos la
+#      partición se puede regenerar sin los datos.
+#    - Si la matriz de origen cambia de tamaño, `ParticionIndices` avisa en lugar de devolver filas equivocadas.
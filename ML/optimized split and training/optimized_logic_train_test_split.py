@@ -1,103 +1,213 @@
 # Importaciones necesarias
+import hashlib
+import json
 import os
 import pickle
-import torch
 import numpy as np
-from sklearn.model_selection import train_test_split
+import pandas as pd
 from sklearn.discriminant_analysis import LinearDiscriminantAnalysis
+from optimized_logic_audio_loader import cargar_tensor_de_audio_desde_ruta  # Reexportada por compatibilidad
+from optimized_logic_feature_store import abrir_almacen, construir_almacen, leer_indice
+from optimized_logic_scheduler import ejecutar_rejilla
+from optimized_logic_splits import guardar_particion
 
-# Función para cargar tensores de audio
-def cargar_tensor_de_audio_desde_ruta(ruta_archivo):
+# Directorio base para guardar resultados
+directorio_base = "ruta/a/tu/directorio/base"
+
+# Lista de combinaciones de características
+combinaciones_caracteristicas = ['feature_1', 'feature_2', 'feature_3', 'feature_4', 'feature_5', 'feature_6']
+
+# Tipos de características
+tipos_caracteristicas = ['type_a', 'type_b']
+
+# Archivo con la huella de las entradas de cada combinación
+ARCHIVO_HUELLA = 'huella.json'
+ARCHIVOS_RESULTADO = ['X_lda.npy', 'y.pkl', 'filas_almacen.npy', 'particion.json', 'indices_train.npy', 'indices_test.npy']
+
+def huella_combinacion(rutas, y, parametros_lda, test_size, random_state, estado_archivos=None, filas=None):
     """
-    Carga un tensor de audio desde una ruta de archivo específica.
+    Huella SHA-256 de las entradas de una combinación (característica, tipo).
+
+    Cubre la lista ordenada de archivos, el estado de cada uno en el almacén (fecha de modificación
+    y tamaño) y su fila en el almacén, las etiquetas, los parámetros de LDA y los de la división
+    train-test: si no cambia ninguno, los resultados guardados siguen siendo válidos.
 
     Args:
-        ruta_archivo (str): Ruta del archivo de audio.
+        rutas (pd.Series): Ruta de cada fila, en orden.
+        y (pd.Series): Etiquetas de cada fila.
+        parametros_lda (dict): `LinearDiscriminantAnalysis.get_params()`.
+        test_size (float): Proporción de prueba.
+        random_state (int): Semilla de la división.
+        estado_archivos (list, opcional): Fecha de modificación y tamaño de cada ruta, en orden.
+        filas (np.ndarray, opcional): Fila del almacén de cada ruta (cambia si el almacén se reconstruye
+            en otro orden, aunque los archivos sean los mismos).
 
     Returns:
-        tensor: El tensor de audio cargado o None si ocurre un error.
+        str: Huella hexadecimal.
+    """
+    huella = hashlib.sha256()
+    huella.update(repr((sorted(parametros_lda.items()), test_size, random_state, len(rutas), str(y.dtype))).encode())
+    huella.update(pd.util.hash_pandas_object(pd.Series(rutas, dtype=object), index=False).values.tobytes())
+    huella.update(pd.util.hash_pandas_object(pd.Series(y), index=False).values.tobytes())
+    if estado_archivos is not None:
+        estado = pd.Series([repr(e) for e in estado_archivos], dtype=object)
+        huella.update(pd.util.hash_pandas_object(estado, index=False).values.tobytes())
+    if filas is not None:
+        huella.update(np.ascontiguousarray(filas, dtype=np.int64).tobytes())
+    return huella.hexdigest()
+
+def _resultados_vigentes(directorio_caracteristica, huella):
+    """
+    True si la combinación ya se procesó con las mismas entradas y todos sus archivos existen.
     """
     try:
-        tensor = torch.load(ruta_archivo)
-        return tensor
-    except Exception as e:
-        print(f"Error al cargar el tensor desde {ruta_archivo}: {str(e)}")
-        return None
+        with open(os.path.join(directorio_caracteristica, ARCHIVO_HUELLA)) as f:
+            guardada = json.load(f)['huella']
+    except (OSError, ValueError, KeyError):
+        return False
+    return guardada == huella and all(
+        os.path.exists(os.path.join(directorio_caracteristica, archivo)) for archivo in ARCHIVOS_RESULTADO
+    )
+
+def procesar_combinacion(rutas, y, filas, directorio_caracteristica, directorio_almacen, test_size=0.2,
+                         random_state=42, usar_cache=True):
+    """
+    Procesa una combinación (característica, tipo): LDA, división train-test por índices y guardado.
 
-# Directorio base para guardar resultados
-directorio_base = "ruta/a/tu/directorio/base"
+    Es el trabajo que `procesar_datos` reparte entre procesos: solo recibe las rutas, las etiquetas
+    y las filas del almacén, y abre la matriz del almacén proyectada en memoria (ver `abrir_almacen`).
 
-# Lista de combinaciones de características
-combinaciones_caracteristicas = ['feature_1', 'feature_2', 'feature_3', 'feature_4', 'feature_5', 'feature_6']
+    Args:
+        rutas (pd.Series): Ruta de cada fila.
+        y (pd.Series): Variable objetivo de cada fila.
+        filas (np.ndarray): Fila del almacén de cada ruta.
+        directorio_caracteristica (str): Directorio de resultados de la combinación.
+        directorio_almacen (str): Directorio del almacén de características del tipo.
+        test_size (float, opcional): Proporción de prueba de la división train-test.
+        random_state (int, opcional): Semilla de la división train-test.
+        usar_cache (bool, opcional): Omitir la combinación si sus entradas no han cambiado.
 
-# Tipos de características
-tipos_caracteristicas = ['type_a', 'type_b']
+    Returns:
+        str: 'cache' si se reutilizaron los resultados guardados, 'calculada' si se recalculó.
+    """
+    os.makedirs(directorio_caracteristica, exist_ok=True)
+    X_total, _ = abrir_almacen(directorio_almacen)
+
+    # Configurar LDA y comprobar si las entradas cambiaron desde la última ejecución
+    n_componentes_lda = min(X_total.shape[1], len(np.unique(y)) - 1)
+    n_componentes_lda = min(n_componentes_lda, 7)  # Máximo de 7 componentes
+    lda = LinearDiscriminantAnalysis(n_components=n_componentes_lda)
+    indice = leer_indice(directorio_almacen)  # Un archivo modificado se refresca en su fila: su estado cambia la huella
+    estado_archivos = [(indice['mtime'][fila], indice['tamano'][fila]) for fila in filas]
+    huella = huella_combinacion(rutas, y, lda.get_params(), test_size, random_state, estado_archivos, filas)
+    if usar_cache and _resultados_vigentes(directorio_caracteristica, huella):
+        return 'cache'
+
+    # Reducir dimensiones con LDA. Si las filas del tipo son un rango contiguo del almacén (lo habitual: el
+    # almacén del tipo sigue el orden del dataset) se usa una vista del memmap en lugar de una copia
+    if len(filas) and np.array_equal(filas, np.arange(filas[0], filas[0] + len(filas))):
+        X = X_total[filas[0]:filas[0] + len(filas)]
+    else:
+        X = X_total[filas]  # (n_tipo, n_valores): solo se leen del disco las filas del tipo
+    X_lda = lda.fit_transform(X, y)
+
+    # Guardar proyecciones LDA (legibles con np.load(..., mmap_mode='r'))
+    np.save(os.path.join(directorio_caracteristica, 'X_lda.npy'), X_lda)
+
+    # Dividir datos en entrenamiento y prueba: solo se guardan los índices y el manifiesto
+    guardar_particion(directorio_caracteristica, len(X_lda), 'X_lda.npy', 'y.pkl', test_size, random_state)
+
+    # Guardar datos originales: filas del almacén (en lugar de una copia de X) y etiquetas
+    np.save(os.path.join(directorio_caracteristica, 'filas_almacen.npy'), filas)
+    with open(os.path.join(directorio_caracteristica, 'y.pkl'), 'wb') as f:
+        pickle.dump(y, f)
+
+    # La huella se escribe al final: una ejecución interrumpida se repite en la siguiente
+    with open(os.path.join(directorio_caracteristica, ARCHIVO_HUELLA), 'w') as f:
+        json.dump({'huella': huella, 'n_filas': len(y)}, f)
+    return 'calculada'
 
 # Función principal
-def procesar_datos(dataset, directorio_base, combinaciones_caracteristicas, tipos_caracteristicas):
+def procesar_datos(dataset, directorio_base, combinaciones_caracteristicas, tipos_caracteristicas,
+                   max_workers=8, prefetch=64, directorio_almacen=None, test_size=0.2, random_state=42,
+                   usar_cache=True, max_procesos=None):
     """
     Procesa datos de audio para diferentes combinaciones de características y guarda
-    los resultados en archivos pickle tras realizar LDA y división train-test.
+    los resultados tras realizar LDA y división train-test.
+
+    Los tensores de audio de cada tipo se vuelcan una sola vez en su almacén de características
+    proyectado en memoria (ver `optimized_logic_feature_store.py`), que en ejecuciones posteriores
+    solo lee los archivos nuevos o modificados. Después, las combinaciones característica × tipo
+    se procesan en paralelo con `ejecutar_rejilla` (un proceso por combinación, admitidas según la memoria libre).
+
+    Cada combinación es un trabajo independiente que lee las filas de su tipo del almacén: las
+    características de un mismo tipo comparten el archivo a través de la caché de páginas del sistema
+    (solo la primera lectura va al disco) y pueden ajustarse en paralelo. Agrupar los trabajos por tipo
+    ahorraría esas lecturas repetidas a cambio de ajustar en serie las características de cada tipo.
+
+    Cada combinación guarda una huella de sus entradas (ver `huella_combinacion`); si en una ejecución
+    posterior no han cambiado ni los archivos ni las etiquetas ni los parámetros, se omite sin leer
+    sus datos ni volver a ajustar LDA. Al añadir audios solo se recalculan los tipos afectados.
+    La granularidad es la combinación: un solo archivo nuevo o modificado invalida todas las
+    características de su tipo, y cada una repite desde cero el ajuste de LDA y la división train-test
+    (no hay actualización incremental de LDA).
 
     Args:
         dataset (pd.DataFrame): Dataset etiquetado con columnas como 'filepath' y características objetivo.
         directorio_base (str): Directorio base donde se guardarán los resultados.
         combinaciones_caracteristicas (list): Lista de características objetivo.
         tipos_caracteristicas (list): Lista de tipos de características (ej. type_a, type_b).
-    """
-    for caracteristica in combinaciones_caracteristicas:
-        for tipo_caracteristica in tipos_caracteristicas:
-            # Crear ruta para guardar resultados
-            directorio_caracteristica = os.path.join(directorio_base, caracteristica, tipo_caracteristica)
-            os.makedirs(directorio_caracteristica, exist_ok=True)
-
-            # Filtrar dataset por tipo de característica
-            if tipo_caracteristica == 'type_a':
-                rutas_archivos = dataset[dataset['subfolder'] == 'type_a']['filepath']
-            elif tipo_caracteristica == 'type_b':
-                rutas_archivos = dataset[dataset['subfolder'] == 'type_b']['filepath']
-
-            # Cargar tensores de audio
-            tensores_audio = [cargar_tensor_de_audio_desde_ruta(ruta) for ruta in rutas_archivos if ruta]
-            tensores_audio = [tensor for tensor in tensores_audio if tensor is not None]
-
-            # Convertir lista de tensores en un tensor de PyTorch
-            X = torch.stack(tensores_audio).view(len(tensores_audio), -1)
+        max_workers (int, opcional): Hilos de lectura de tensores.
+        prefetch (int, opcional): Lecturas de tensores en vuelo como máximo.
+        directorio_almacen (str, opcional): Directorio de los almacenes de características, con un
+            subdirectorio por tipo (por defecto, 'almacen_caracteristicas' dentro de `directorio_base`).
+        test_size (float, opcional): Proporción de prueba de la división train-test.
+        random_state (int, opcional): Semilla de la división train-test.
+        usar_cache (bool, opcional): Omitir las combinaciones cuyas entradas no han cambiado.
+        max_procesos (int, opcional): Combinaciones procesadas a la vez (por defecto, los núcleos disponibles).
 
+    Returns:
+        pd.DataFrame: Resumen por combinación (ver `ejecutar_rejilla`); 'resultado' vale 'cache' o 'calculada'.
+    """
+    directorio_almacen = directorio_almacen or os.path.join(directorio_base, 'almacen_caracteristicas')
+
+    trabajos = []
+    for tipo_caracteristica in tipos_caracteristicas:
+        # Construir (o actualizar) el almacén del tipo, con una sola forma de tensor, y abrirlo sin leerlo
+        dataset_tipo = dataset[dataset['subfolder'] == tipo_caracteristica]
+        directorio_almacen_tipo = os.path.join(directorio_almacen, tipo_caracteristica)
+        construir_almacen(dataset_tipo['filepath'], directorio_almacen_tipo, max_workers, prefetch)
+        X_total, rutas_cargadas = abrir_almacen(directorio_almacen_tipo)
+        bytes_por_fila = X_total.shape[1] * X_total.dtype.itemsize
+
+        # Quedarse con las filas cuyo tensor se cargó
+        filas = rutas_cargadas.get_indexer(dataset_tipo['filepath'])
+        cargadas = filas >= 0
+        dataset_tipo = dataset_tipo[cargadas]
+        filas = filas[cargadas]
+
+        for caracteristica in combinaciones_caracteristicas:
             # Definir variable objetivo (y)
             if caracteristica in ['feature_5', 'feature_6']:
-                y = dataset[dataset['subfolder'] == tipo_caracteristica][caracteristica]
+                y = dataset_tipo[caracteristica]
             else:
-                y = dataset[dataset['subfolder'] == tipo_caracteristica][f"{caracteristica}_encoded"]
-
-            # Reducir dimensiones con LDA
-            n_componentes_lda = min(X.shape[1], len(np.unique(y)) - 1)
-            n_componentes_lda = min(n_componentes_lda, 7)  # Máximo de 7 componentes
-            lda = LinearDiscriminantAnalysis(n_components=n_componentes_lda)
-            X_lda = lda.fit_transform(X, y)
-
-            # Guardar proyecciones LDA
-            with open(os.path.join(directorio_caracteristica, 'X_lda.pkl'), 'wb') as f:
-                pickle.dump(X_lda, f)
-
-            # Dividir datos en entrenamiento y prueba
-            X_train, X_test, y_train, y_test = train_test_split(X_lda, y, test_size=0.2, random_state=42)
-
-            # Guardar conjuntos de datos
-            with open(os.path.join(directorio_caracteristica, 'X_train.pkl'), 'wb') as f:
-                pickle.dump(X_train, f)
-            with open(os.path.join(directorio_caracteristica, 'X_test.pkl'), 'wb') as f:
-                pickle.dump(X_test, f)
-            with open(os.path.join(directorio_caracteristica, 'y_train.pkl'), 'wb') as f:
-                pickle.dump(y_train, f)
-            with open(os.path.join(directorio_caracteristica, 'y_test.pkl'), 'wb') as f:
-                pickle.dump(y_test, f)
-
-            # Guardar datos originales
-            with open(os.path.join(directorio_caracteristica, 'X.pkl'), 'wb') as f:
-                pickle.dump(X, f)
-            with open(os.path.join(directorio_caracteristica, 'y.pkl'), 'wb') as f:
-                pickle.dump(y, f)
+                y = dataset_tipo[f"{caracteristica}_encoded"]
+
+            clave = {'caracteristica': caracteristica, 'tipo': tipo_caracteristica}
+            kwargs = {
+                'rutas': dataset_tipo['filepath'],
+                'y': y,
+                'filas': filas,
+                'directorio_caracteristica': os.path.join(directorio_base, caracteristica, tipo_caracteristica),
+                'directorio_almacen': directorio_almacen_tipo,
+                'test_size': test_size,
+                'random_state': random_state,
+                'usar_cache': usar_cache,
+            }
+            memoria_gb = 3 * len(filas) * bytes_por_fila / 1024 ** 3  # X en memoria y temporales de LDA
+            trabajos.append((clave, kwargs, memoria_gb))
+
+    return ejecutar_rejilla(procesar_combinacion, trabajos, max_procesos)
 
 # # Ejemplo de uso
 # if __name__ == "__main__":
@@ -110,4 +220,5 @@ def procesar_datos(dataset, directorio_base, combinaciones_caracteristicas, tipo
 #         dataset = pickle.load(archivo)
 
 #     # Procesar datos
-#     procesar_datos(dataset, directorio_base, combinaciones_caracteristicas, tipos_caracteristicas)
+#     resumen = procesar_datos(dataset, directorio_base, combinaciones_caracteristicas, tipos_caracteristicas)
+#     print(resumen[['caracteristica', 'tipo', 'estado', 'segundos', 'resultado']])
@@ -1,51 +1,191 @@
 # Importaciones necesarias
-from sklearn.metrics import r2_score, mean_squared_error, mean_absolute_error, median_absolute_error, max_error
+import numpy as np
+import pandas as pd
 import math
 
-# Función para evaluar modelos de regresión
-def metriques(titulo, df, ytest, prediccio):
+# Columnas de la tabla de resultados (mismo orden que las filas de `metriques`)
+COLUMNAS_METRICAS = ['Modelo', 'R2', 'R2 (%)', 'MSE', 'RMSE', 'MAE', 'MAPE (%)', 'Mediana_AE', 'Max_Error']
+
+# Núcleo vectorizado: un vector de valores reales frente a una o varias predicciones
+def _metricas_matriz(y, P):
     """
-    Evalúa un modelo de regresión mediante diversas métricas.
+    Calcula las métricas de regresión de varios modelos a la vez.
+
+    Args:
+        y (np.ndarray): Valores reales, float64 contiguo de forma (n,).
+        P (np.ndarray): Predicciones, float64 de forma (m, n), una fila por modelo.
+
+    Returns:
+        dict: Arrays de forma (m,) sin redondear ('r2', 'mse', 'rmse', 'mae', 'mape', 'mediana_ae', 'max_err').
+    """
+    n = y.size
+    media = y.mean()
+
+    residuos = np.subtract(y, P)                   # Único buffer de trabajo (m, n), filas contiguas
+    sse = np.einsum('ij,ij->i', residuos, residuos)  # Suma de errores al cuadrado por modelo
+    np.abs(residuos, out=residuos)                 # Errores absolutos (in-place)
+    mae = residuos.mean(axis=1)
+    max_err = residuos.max(axis=1)
+    mediana_ae = np.median(residuos, axis=1, overwrite_input=True)  # Reordena el buffer sin copiarlo
+
+    # La varianza total solo depende de y: se calcula una vez para todos los modelos
+    desviacion = y - media
+    sst = np.dot(desviacion, desviacion)
+
+    # Mismas convenciones que sklearn.metrics.r2_score (una sola muestra o varianza nula)
+    if n < 2:
+        r2 = np.full(sse.shape, np.nan)
+    elif sst == 0:
+        r2 = np.where(sse == 0, 1.0, 0.0)
+    else:
+        r2 = 1 - sse / sst
+
+    mse = sse / n
+    return {
+        'r2': r2,
+        'mse': mse,
+        'rmse': np.sqrt(mse),
+        'mae': mae,
+        'mape': (mae / max(1e-10, media)) * 100,  # Evitar división por cero
+        'mediana_ae': mediana_ae,
+        'max_err': max_err,
+    }
+
+def _validar_ytest(ytest):
+    """
+    Convierte `ytest` a un vector float64 contiguo y comprueba que no esté vacío.
+    """
+    y = np.ascontiguousarray(ytest, dtype=np.float64).ravel()
+    if y.size == 0:
+        raise ValueError("ytest no puede estar vacío")
+    return y
+
+# Motor vectorizado de métricas de regresión
+def calcular_metricas(ytest, prediccio):
+    """
+    Calcula todas las métricas de regresión a partir de un único buffer de residuos.
+
+    Las entradas se convierten una sola vez a arrays contiguos de tipo float64 y el
+    mismo buffer se reutiliza para los residuos y sus valores absolutos, sin copias
+    intermedias por métrica.
 
     Args:
-        titulo (str): Nombre o descripción del modelo evaluado.
-        df (list): Lista existente para agregar las métricas calculadas.
         ytest (array-like): Valores reales de la variable objetivo.
         prediccio (array-like): Valores predichos por el modelo.
 
     Returns:
-        list: Lista actualizada con las métricas calculadas.
+        dict: Métricas sin redondear ('r2', 'mse', 'rmse', 'mae', 'mape', 'mediana_ae', 'max_err').
+    """
+    y = _validar_ytest(ytest)
+    p = np.ascontiguousarray(prediccio, dtype=np.float64).ravel()
+    if y.shape != p.shape:
+        raise ValueError(f"ytest y prediccio deben tener la misma longitud ({y.size} != {p.size})")
+
+    resultados = _metricas_matriz(y, p[np.newaxis, :])
+    return {clave: float(valor[0]) for clave, valor in resultados.items()}
+
+# Evaluación de varios modelos en una sola pasada
+def metriques_lote(ytest, predicciones, nombres=None, decimales=2):
+    """
+    Evalúa varios modelos de regresión frente al mismo `ytest` y devuelve una tabla de métricas.
+
+    `ytest` se valida y convierte una sola vez, y todas las métricas se calculan de forma
+    vectorizada para todos los modelos a la vez.
+
+    Args:
+        ytest (array-like): Valores reales de la variable objetivo, de longitud n.
+        predicciones (dict o array-like): Diccionario {nombre: predicción} o matriz (n, m)
+            con una columna por modelo. También acepta un pd.DataFrame (una columna por modelo).
+        nombres (list, opcional): Nombres de los modelos cuando `predicciones` es una matriz.
+            Por defecto se usan los nombres de columna del DataFrame o 'modelo_<i>'.
+        decimales (int, opcional): Decimales de redondeo (None para no redondear).
+
+    Returns:
+        pd.DataFrame: Una fila por modelo con las columnas de `COLUMNAS_METRICAS`.
+    """
+    y = _validar_ytest(ytest)
+
+    if isinstance(predicciones, dict):
+        nombres = list(predicciones.keys())
+        P = np.empty((len(nombres), y.size), dtype=np.float64)
+        for i, prediccio in enumerate(predicciones.values()):
+            fila = np.asarray(prediccio, dtype=np.float64).ravel()
+            if fila.size != y.size:
+                raise ValueError(f"La predicción '{nombres[i]}' tiene {fila.size} valores, se esperaban {y.size}")
+            P[i] = fila
+    else:
+        if nombres is None and isinstance(predicciones, pd.DataFrame):
+            nombres = [str(c) for c in predicciones.columns]
+        matriz = np.asarray(predicciones, dtype=np.float64)
+        if matriz.ndim == 1:
+            matriz = matriz[:, np.newaxis]
+        if matriz.ndim != 2 or matriz.shape[0] != y.size:
+            raise ValueError(f"predicciones debe tener forma (n, m) con n={y.size}, se recibió {matriz.shape}")
+        P = matriz.T  # (m, n); np.subtract genera el buffer de residuos con filas contiguas
+        if nombres is None:
+            nombres = [f"modelo_{i}" for i in range(P.shape[0])]
+        elif len(nombres) != P.shape[0]:
+            raise ValueError(f"Se recibieron {len(nombres)} nombres para {P.shape[0]} modelos")
+
+    m = _metricas_matriz(y, P)
+    m['r2_pct'] = m['r2'] * 100
+    if decimales is not None:
+        m = {clave: np.round(valor, decimales) for clave, valor in m.items()}
+        m['r2_pct'] = np.round(m['r2'] * 100, decimales)  # Igual que `metriques`: porcentaje del R² redondeado
+
+    return pd.DataFrame({
+        'Modelo': pd.Series(nombres, dtype='string'),
+        'R2': m['r2'],
+        'R2 (%)': m['r2_pct'],
+        'MSE': m['mse'],
+        'RMSE': m['rmse'],
+        'MAE': m['mae'],
+        'MAPE (%)': m['mape'],
+        'Mediana_AE': m['mediana_ae'],
+        'Max_Error': m['max_err'],
+    }, columns=COLUMNAS_METRICAS)
+
+# Fila de resultados con el formato de `metriques`
+def _fila_metricas(titulo, m):
+    """
+    Redondea las métricas de `calcular_metricas` y las ordena en la fila que agrega `metriques`.
+
+    Args:
+        titulo (str): Nombre o descripción del modelo evaluado.
+        m (dict): Métricas sin redondear.
+
+    Returns:
+        list: [titulo, R², R² %, MSE, RMSE, MAE, MAPE %, Mediana del Error Absoluto, Máximo Error].
     """
-    # Calcular R² (Coeficiente de determinación)
+    # R² (Coeficiente de determinación)
     # Mide qué proporción de la varianza de la variable dependiente es explicada por el modelo.
-    r2 = round(r2_score(ytest, prediccio), 2)
+    r2 = round(m['r2'], 2)
 
-    # Calcular MSE (Error Cuadrático Medio)
+    # MSE (Error Cuadrático Medio)
     # Promedio de los errores al cuadrado. Penaliza errores grandes.
-    mse = round(mean_squared_error(ytest, prediccio), 2)
+    mse = round(m['mse'], 2)
 
-    # Calcular RMSE (Raíz del Error Cuadrático Medio)
+    # RMSE (Raíz del Error Cuadrático Medio)
     # Raíz cuadrada del MSE. Representa el error promedio en las mismas unidades que la variable objetivo.
-    rmse = round(math.sqrt(mean_squared_error(ytest, prediccio)), 2)
+    rmse = round(m['rmse'], 2)
 
-    # Calcular MAE (Error Absoluto Medio)
+    # MAE (Error Absoluto Medio)
     # Promedio de los errores absolutos. Menos sensible a valores atípicos que el MSE.
-    mae = round(mean_absolute_error(ytest, prediccio), 2)
+    mae = round(m['mae'], 2)
 
-    # Calcular MAPE (Error Absoluto Porcentual Medio)
+    # MAPE (Error Absoluto Porcentual Medio)
     # Proporción promedio del error relativo respecto a los valores reales.
-    mape = round((mean_absolute_error(ytest, prediccio) / max(1e-10, sum(ytest) / len(ytest))) * 100, 2)  # Evitar división por cero
+    mape = round(m['mape'], 2)
 
-    # Calcular Mediana del Error Absoluto
+    # Mediana del Error Absoluto
     # Mide la mediana de los errores absolutos. Robusto frente a valores atípicos.
-    mediana_ae = round(median_absolute_error(ytest, prediccio), 2)
+    mediana_ae = round(m['mediana_ae'], 2)
 
-    # Calcular Máximo Error
+    # Máximo Error
     # Error más alto entre los valores predichos y reales.
-    max_err = round(max_error(ytest, prediccio), 2)
+    max_err = round(m['max_err'], 2)
 
-    # Agregar las métricas calculadas a la lista
-    df.append([
+    return [
         titulo,                # Nombre del modelo
         r2,                   # R²
         "{} %".format(round(r2 * 100, 2)),  # R² como porcentaje
@@ -55,7 +195,214 @@ def metriques(titulo, df, ytest, prediccio):
         "{} %".format(mape),  # MAPE como porcentaje
         mediana_ae,           # Mediana del Error Absoluto
         max_err               # Máximo Error
-    ])
+    ]
+
+# Función para evaluar modelos de regresión
+def metriques(titulo, df, ytest, prediccio):
+    """
+    Evalúa un modelo de regresión mediante diversas métricas.
+
+    Args:
+        titulo (str): Nombre o descripción del modelo evaluado.
+        df (list): Lista existente para agregar las métricas calculadas.
+        ytest (array-like): Valores reales de la variable objetivo.
+        prediccio (array-like): Valores predichos por el modelo.
+
+    Returns:
+        list: Lista actualizada con las métricas calculadas.
+    """
+    # Agregar las métricas calculadas a la lista
+    df.append(_fila_metricas(titulo, calcular_metricas(ytest, prediccio)))
+
+    return df
+
+# Sketch de cuantiles con error relativo acotado (estilo DDSketch)
+class _SketchCuantiles:
+    """
+    Histograma logarítmico fusionable para aproximar cuantiles de valores no negativos.
+
+    Cada valor x > 0 cae en el bucket ceil(log_gamma(x)), con gamma = (1 + alpha) / (1 - alpha),
+    de modo que cualquier cuantil se estima con un error relativo máximo de `alpha`. La memoria
+    depende del rango dinámico de los valores, no del número de observaciones.
+    """
+
+    def __init__(self, alpha=0.01):
+        self.alpha = alpha
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self._log_gamma = math.log(self.gamma)
+        self.ceros = 0
+        self.buckets = {}
+
+    def update(self, valores):
+        positivos = valores[valores > 0]
+        self.ceros += int(valores.size - positivos.size)
+        if positivos.size:
+            indices = np.ceil(np.log(positivos) / self._log_gamma).astype(np.int64)
+            claves, conteos = np.unique(indices, return_counts=True)
+            for clave, conteo in zip(claves.tolist(), conteos.tolist()):
+                self.buckets[clave] = self.buckets.get(clave, 0) + conteo
+
+    def merge(self, otro):
+        if otro.gamma != self.gamma:
+            raise ValueError("Solo se pueden fusionar sketches con la misma precisión (alpha)")
+        self.ceros += otro.ceros
+        for clave, conteo in otro.buckets.items():
+            self.buckets[clave] = self.buckets.get(clave, 0) + conteo
+
+    def cuantil(self, q):
+        total = self.ceros + sum(self.buckets.values())
+        if total == 0:
+            return float('nan')
+        rango = q * (total - 1)
+        if rango < self.ceros:
+            return 0.0
+        acumulado = self.ceros
+        for clave in sorted(self.buckets):
+            acumulado += self.buckets[clave]
+            if acumulado > rango:
+                return 2 * self.gamma ** clave / (self.gamma + 1)  # Punto medio relativo del bucket
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+# Acumulador incremental de métricas de regresión
+class AcumuladorMetricas:
+    """
+    Calcula las métricas de `metriques` sobre flujos de datos que no caben en memoria.
+
+    Mantiene estadísticos suficientes (conteo, media y suma de cuadrados centrada de ytest,
+    suma de errores al cuadrado y absolutos, error máximo) más un sketch de cuantiles para la
+    mediana del error absoluto, por lo que la memoria es constante respecto al número de filas.
+    Los acumuladores son serializables con pickle y pueden fusionarse entre procesos con `merge`.
+
+    Todas las métricas son exactas salvo la Mediana del Error Absoluto, que es aproximada
+    con un error relativo máximo de `alpha`.
+    """
+
+    def __init__(self, alpha=0.01):
+        self.n = 0
+        self.media_y = 0.0
+        self.m2_y = 0.0       # Suma de cuadrados centrada de ytest (varianza total)
+        self.sse = 0.0        # Suma de errores al cuadrado
+        self.sae = 0.0        # Suma de errores absolutos
+        self.max_err = 0.0
+        self.sketch = _SketchCuantiles(alpha)
+
+    def _combinar_momentos(self, n, media, m2):
+        # Combinación de medias y sumas de cuadrados centradas (Chan et al.)
+        total = self.n + n
+        delta = media - self.media_y
+        self.m2_y += m2 + delta * delta * self.n * n / total
+        self.media_y += delta * n / total
+        self.n = total
+
+    def update(self, ytest, prediccio):
+        """
+        Incorpora un bloque de valores reales y predichos.
+
+        Args:
+            ytest (array-like): Valores reales del bloque.
+            prediccio (array-like): Valores predichos del bloque.
+
+        Returns:
+            AcumuladorMetricas: El propio acumulador, para encadenar llamadas.
+        """
+        y = np.ascontiguousarray(ytest, dtype=np.float64).ravel()
+        p = np.ascontiguousarray(prediccio, dtype=np.float64).ravel()
+        if y.shape != p.shape:
+            raise ValueError(f"ytest y prediccio deben tener la misma longitud ({y.size} != {p.size})")
+        if y.size == 0:
+            return self
+
+        media = y.mean()
+        desviacion = y - media
+        m2 = float(np.dot(desviacion, desviacion))
+
+        residuos = np.subtract(y, p, out=desviacion)  # Reutilizar el buffer del bloque
+        self.sse += float(np.dot(residuos, residuos))
+        np.abs(residuos, out=residuos)
+        self.sae += float(residuos.sum())
+        self.max_err = max(self.max_err, float(residuos.max()))
+        self.sketch.update(residuos)
+
+        self._combinar_momentos(y.size, float(media), m2)
+        return self
+
+    def merge(self, otro):
+        """
+        Fusiona otro acumulador (por ejemplo, de otro proceso) en este.
+
+        Args:
+            otro (AcumuladorMetricas): Acumulador con las mismas métricas parciales.
+
+        Returns:
+            AcumuladorMetricas: El propio acumulador, para encadenar llamadas.
+        """
+        if otro.n == 0:
+            return self
+        self.sse += otro.sse
+        self.sae += otro.sae
+        self.max_err = max(self.max_err, otro.max_err)
+        self.sketch.merge(otro.sketch)
+        self._combinar_momentos(otro.n, otro.media_y, otro.m2_y)
+        return self
+
+    def calcular(self):
+        """
+        Devuelve las métricas sin redondear con las mismas claves que `calcular_metricas`.
+        """
+        if self.n == 0:
+            raise ValueError("El acumulador no ha recibido datos")
+
+        # Mismas convenciones que sklearn.metrics.r2_score (una sola muestra o varianza nula)
+        if self.n < 2:
+            r2 = float('nan')
+        elif self.m2_y == 0:
+            r2 = 1.0 if self.sse == 0 else 0.0
+        else:
+            r2 = 1 - self.sse / self.m2_y
+
+        mse = self.sse / self.n
+        mae = self.sae / self.n
+        return {
+            'r2': r2,
+            'mse': mse,
+            'rmse': math.sqrt(mse),
+            'mae': mae,
+            'mape': (mae / max(1e-10, self.media_y)) * 100,  # Evitar división por cero
+            'mediana_ae': self.sketch.cuantil(0.5),
+            'max_err': self.max_err,
+        }
+
+    def finalize(self, titulo):
+        """
+        Devuelve la fila de métricas con el mismo formato que agrega `metriques`.
+
+        Args:
+            titulo (str): Nombre o descripción del modelo evaluado.
+
+        Returns:
+            list: Fila de métricas lista para agregar a la lista `df`.
+        """
+        return _fila_metricas(titulo, self.calcular())
+
+# Evaluación de un modelo a partir de un iterador de bloques
+def metriques_por_bloques(titulo, df, bloques, alpha=0.01):
+    """
+    Equivalente a `metriques` para datos que llegan por bloques (p. ej. lotes de inferencia).
+
+    Args:
+        titulo (str): Nombre o descripción del modelo evaluado.
+        df (list): Lista existente para agregar las métricas calculadas.
+        bloques (iterable): Pares (ytest, prediccio) de cada bloque.
+        alpha (float, opcional): Error relativo máximo de la Mediana del Error Absoluto.
+
+    Returns:
+        list: Lista actualizada con las métricas calculadas.
+    """
+    acumulador = AcumuladorMetricas(alpha=alpha)
+    for ytest, prediccio in bloques:
+        acumulador.update(ytest, prediccio)
+
+    df.append(acumulador.finalize(titulo))
 
     return df
 
@@ -71,4 +418,13 @@ def metriques(titulo, df, ytest, prediccio):
 #    - Máximo Error: Útil para identificar el peor caso en las predicciones.
 
 # 2. Entrada esperada:
-#    - 'df' debe ser una lista que contendrá los resultados. Alternativamente, puede transformarse a un DataFrame después de varias iteraciones.
\ No newline at end of file
+#    - 'df' debe ser una lista que contendrá los resultados. Alternativamente, puede transformarse a un DataFrame después de varias iteraciones.
+
+# 3. Rendimiento:
+#    - `calcular_metricas` convierte las entradas a arrays una sola vez y reutiliza un único buffer de residuos,
+#      por lo que el coste es lineal y la memoria adicional es de un solo vector del tamaño de `ytest`.
+#    - `metriques_lote` evalúa varios modelos de una vez y devuelve directamente un DataFrame tipado
+#      (columnas numéricas, sin el sufijo " %") con las columnas de `COLUMNAS_METRICAS`.
+#    - `AcumuladorMetricas` calcula las mismas métricas por bloques en memoria constante (`update`),
+#      se fusiona entre procesos (`merge`) y devuelve la fila de `metriques` con `finalize`.
+#      La Mediana del Error Absoluto es aproximada (error relativo máximo `alpha`, 1% por defecto).
\ No newline at end of file
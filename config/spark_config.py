@@ -1,36 +1,143 @@
-import findspark
-findspark.init()
-from pyspark import SparkConf, SparkContext
+import os
+try:
+    import findspark
+    findspark.init()  # Solo añade pyspark al sys.path; no arranca la JVM
+except (ImportError, ValueError):
+    pass  # pyspark instalado con pip o SPARK_HOME no definido
+from pyspark import SparkConf
 from pyspark.sql import SparkSession
 from pyspark.sql.functions import col
 from pyspark.ml.feature import VectorAssembler, Imputer, PCA
 from pyspark.ml.clustering import KMeans
 from pyspark.ml import Pipeline
 
-# Si hay un SparkContext existente, debemos cerrarlo antes de crear uno nuevo
-if 'sc' in locals() and sc:
-    sc.stop()  # Detener el SparkContext anterior si existe
-
-# Configuración de Spark
-conf = (
-    SparkConf()
-    .setAppName("Nombre de la app")  # Nombre de la aplicación en Spark
-    .setMaster("local[2]")  # Modo local con un hilo para ejecución
-    .set("spark.driver.host", "127.0.0.1")  # Dirección del host del driver (este Localhost)
-    .set("spark.executor.heartbeatInterval", "3600s")  # Intervalo de latido del executor
-    .set("spark.network.timeout", "7200s")  # Tiempo de espera de la red
-    .set("spark.executor.memory", "14g")  # Memoria asignada para cada executor
-    .set("spark.driver.memory", "14g")  # Memoria asignada para el driver
-)
-
-# Crear un nuevo SparkContext con la configuración especificada
-sc = SparkContext(conf=conf)
-
-# Configuración de SparkSession (interfaz de alto nivel para trabajar con datos estructurados en Spark)
-spark = (
-    SparkSession.builder
-    .appName("Proyecto_PatriciaA_Peña")  # Nombre de la aplicación en Spark
-    .config("spark.sql.repl.eagerEval.enabled", True)  # Habilitar la evaluación perezosa en Spark SQL REPL
-    .config("spark.sql.repl.eagerEval.maxNumRows", 1000)  # Número máximo de filas a mostrar en la evaluación perezosa
-    .getOrCreate()  # Obtener la sesión Spark existente o crear una nueva si no existe
-) 
\ No newline at end of file
+# Nombre por defecto de la aplicación en Spark
+APP_NAME = "Proyecto_PatriciaA_Peña"
+
+# Perfiles de recursos: fracción de los núcleos y de la memoria de la máquina (o valores fijos)
+PROFILES = {
+    'local': {'cores_fraction': 1.0, 'memory_fraction': 0.6},   # Toda la máquina para Spark
+    'shared': {'cores_fraction': 0.5, 'memory_fraction': 0.3},  # Máquina compartida o portátil
+    'small': {'cores': 2, 'memory_gb': 4},                      # Pruebas rápidas
+}
+
+# Sesión creada de forma perezosa por `get_spark`
+_spark = None
+
+def _total_memory_gb():
+    """
+    Memoria disponible para el proceso en GB (límite del cgroup si existe, si no la memoria física).
+    """
+    physical = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') if hasattr(os, 'sysconf') else 8 * 1024 ** 3
+    try:
+        with open('/sys/fs/cgroup/memory.max') as f:
+            limit = f.read().strip()
+        if limit != 'max':
+            physical = min(physical, int(limit))
+    except (OSError, ValueError):
+        pass
+    return physical / 1024 ** 3
+
+def spark_settings(profile=None):
+    """
+    Calcula la configuración de Spark para un perfil a partir de los recursos de la máquina.
+
+    Las variables de entorno tienen prioridad sobre el perfil:
+      - SPARK_PROFILE: perfil por defecto ('local', 'shared' o 'small').
+      - SPARK_APP_NAME: nombre de la aplicación.
+      - SPARK_MASTER_URL: master de Spark (por defecto local[<núcleos>]).
+      - SPARK_CORES: número de núcleos.
+      - SPARK_DRIVER_MEMORY: memoria del driver (ej. '24g').
+
+    Args:
+        profile (str, opcional): Nombre del perfil en `PROFILES`.
+
+    Returns:
+        dict: Pares clave/valor de configuración de Spark (no arranca la JVM).
+    """
+    profile = profile or os.environ.get('SPARK_PROFILE', 'local')
+    if profile not in PROFILES:
+        raise ValueError(f"Perfil de Spark desconocido: '{profile}'. Perfiles disponibles: {sorted(PROFILES)}")
+    spec = PROFILES[profile]
+
+    total_cores = os.cpu_count() or 1
+    cores = int(os.environ.get('SPARK_CORES') or spec.get('cores') or max(1, int(total_cores * spec['cores_fraction'])))
+    memory_gb = spec.get('memory_gb') or max(1, int(_total_memory_gb() * spec['memory_fraction']))
+    driver_memory = os.environ.get('SPARK_DRIVER_MEMORY', f"{memory_gb}g")
+
+    return {
+        'spark.app.name': os.environ.get('SPARK_APP_NAME', APP_NAME),  # Nombre de la aplicación en Spark
+        'spark.master': os.environ.get('SPARK_MASTER_URL', f"local[{cores}]"),  # Un hilo por núcleo asignado
+        'spark.driver.host': "127.0.0.1",  # Dirección del host del driver (este Localhost)
+        'spark.driver.memory': driver_memory,  # En modo local el driver ejecuta también las tareas
+        'spark.executor.memory': driver_memory,
+        'spark.driver.maxResultSize': f"{max(1, memory_gb // 4)}g",  # Límite de lo que se recoge en el driver
+        'spark.sql.shuffle.partitions': str(cores * 3),  # ~3 tareas por núcleo; AQE fusiona las pequeñas
+        'spark.sql.adaptive.enabled': "true",
+        'spark.sql.adaptive.coalescePartitions.enabled': "true",
+        'spark.sql.execution.arrow.pyspark.enabled': "true",  # toPandas/createDataFrame con Arrow
+        'spark.sql.execution.arrow.pyspark.fallback.enabled': "true",
+        'spark.executor.heartbeatInterval': "60s",  # Intervalo de latido del executor
+        'spark.network.timeout': "600s",  # Tiempo de espera de la red (mayor que el latido)
+        'spark.sql.repl.eagerEval.enabled': "true",  # Habilitar la evaluación perezosa en Spark SQL REPL
+        'spark.sql.repl.eagerEval.maxNumRows': "1000",  # Número máximo de filas a mostrar en la evaluación perezosa
+    }
+
+def get_spark(profile=None, **overrides):
+    """
+    Devuelve la SparkSession del proyecto, creándola la primera vez que se pide.
+
+    Importar este módulo no arranca la JVM: la sesión se crea aquí, dimensionada según el
+    perfil y los recursos detectados (ver `spark_settings`). Si ya existe una sesión activa
+    se reutiliza.
+
+    Args:
+        profile (str, opcional): Nombre del perfil en `PROFILES` (por defecto SPARK_PROFILE o 'local').
+        **overrides: Claves de configuración de Spark adicionales o que sustituyen a las del perfil,
+            con los puntos sustituidos por '__' (ej. spark__sql__shuffle__partitions=64).
+
+    Returns:
+        SparkSession: Sesión de Spark.
+    """
+    global _spark
+    if _spark is not None and _spark.sparkContext._jsc is not None:
+        return _spark
+
+    settings = spark_settings(profile)
+    settings.update({key.replace('__', '.'): str(value) for key, value in overrides.items()})
+    conf = SparkConf().setAll(list(settings.items()))
+    _spark = SparkSession.builder.config(conf=conf).getOrCreate()
+    return _spark
+
+def stop_spark():
+    """
+    Detiene la sesión creada por `get_spark`, si existe.
+    """
+    global _spark
+    if _spark is not None:
+        _spark.stop()
+        _spark = None
+
+def __getattr__(name):
+    """
+    Compatibilidad con `from spark_config import spark, sc`: la sesión se crea al acceder al atributo.
+    """
+    if name == 'spark':
+        return get_spark()
+    if name == 'sc':
+        return get_spark().sparkContext
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Notas sobre el uso:
+# -------------------
+# 1. Ejemplo:
+#    from spark_config import get_spark
+#    spark = get_spark()                  # Perfil 'local': todos los núcleos y ~60% de la memoria
+#    spark = get_spark(profile='shared')  # Mitad de los núcleos y ~30% de la memoria
+#
+# 2. Configuración por entorno (útil en servidores y CI):
+#    SPARK_PROFILE=shared SPARK_DRIVER_MEMORY=24g python script.py
+#
+# 3. Compatibilidad:
+#    - `spark` y `sc` siguen pudiendo importarse desde este módulo; la sesión se crea en el primer acceso.
+#    - Para cambiar de perfil en la misma sesión de Python, llama antes a `stop_spark()`.
\ No newline at end of file